@@ -0,0 +1,83 @@
+"""Compares the read_sql_typed backends on a local PostgreSQL with synthetic data.
+
+    python benchmarks/bench_loader.py --database-url postgresql+psycopg2://u:p@localhost/bench
+
+The database is overwritten with benchmarks/synthetic.py tables unless --skip-load.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+BACKENDS = ["read_sql", "cursor", "copy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), required=not os.getenv("DATABASE_URL"))
+    parser.add_argument("--months", type=float, default=12)
+    parser.add_argument("--yard-size", type=int, default=400)
+    parser.add_argument("--visits-per-day", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    # pipeline reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    import pipeline
+    from queries import controle_patio_query
+    from synthetic import generate, load_tables
+
+    engine = pipeline.get_engine()
+    if not args.skip_load:
+        frames = generate(months=args.months, yard_size=args.yard_size, visits_per_day=args.visits_per_day)
+        load_tables(engine, frames)
+
+    results, frames = [], {}
+    for backend in BACKENDS:
+        timings = []
+        for _ in range(args.repeat):
+            with engine.connect() as conn:
+                start = time.perf_counter()
+                df = pipeline.read_sql_typed(controle_patio_query, conn, backend=backend)
+                timings.append(time.perf_counter() - start)
+
+        # Separate run: tracemalloc slows the loaders down
+        tracemalloc.start()
+        with engine.connect() as conn:
+            pipeline.read_sql_typed(controle_patio_query, conn, backend=backend)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        frames[backend] = df
+        results.append(
+            {
+                "backend": backend,
+                "rows": len(df),
+                "best_s": round(min(timings), 4),
+                "median_s": round(sorted(timings)[len(timings) // 2], 4),
+                "peak_mb": round(peak / 1e6, 1),
+                "frame_mb": round(df.memory_usage(deep=True).sum() / 1e6, 1),
+            }
+        )
+        print(json.dumps(results[-1]))
+
+    # Same DataFrame contract from every backend
+    base = frames[BACKENDS[0]].sort_values("CONTROLE_PATIO_ID").reset_index(drop=True)
+    for backend in BACKENDS[1:]:
+        other = frames[backend].sort_values("CONTROLE_PATIO_ID").reset_index(drop=True)
+        same = list(base.columns) == list(other.columns) and base.astype(object).equals(other.astype(object))
+        print(f"{backend} matches {BACKENDS[0]}: {same}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Times each dashboard stage on synthetic yard data and appends the results as JSON.
+
+    python benchmarks/bench_stages.py --months 12 --yard-size 600
+    python benchmarks/bench_stages.py --database-url postgresql+psycopg2://u:p@localhost/bench
+
+With --database-url the synthetic tables are loaded into that (scratch) database and
+load_data runs against it; otherwise its output is assembled in memory from the same
+tables, and the DB stages are skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+DEFAULT_OUTPUT = Path(__file__).with_name("results.jsonl")
+
+
+def timed(fn, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, {
+        "best_s": round(min(timings), 5),
+        "median_s": round(sorted(timings)[len(timings) // 2], 5),
+    }
+
+
+def isolate_files(pipeline, folder):
+    # Keep the benchmark away from the app's cache files
+    import snapshot
+
+    snapshot.CACHE_FILE = folder / "controle_patio_cache.arrow"
+    snapshot.LEGACY_CACHE_FILE = folder / "controle_patio_cache.json"
+    pipeline.RAW_CACHE_FILE = folder / "controle_patio_raw.pkl"
+    pipeline.SHIPPING_LOOKUP.path = folder / "shipping_lookup.pkl"
+    pipeline.COMPOSITION.path = folder / "composition.pkl"
+
+
+def raw_from_frames(pipeline, frames):
+    # In-memory stand-in for load_data(): same joins, same typed output
+    import pandas as pd
+    from composition import CompositionIndex
+
+    cp = frames["controle_patio"].merge(
+        frames["equipamento"].rename(columns={"COD_EQUIPAMENTO": "PLACA"}), on="EQUIPAMENTO_ID"
+    )
+    cp = pipeline.enforce_schema(cp)
+    if pipeline.YARD_QUERY_MODE == "live":
+        cp = pipeline.filter_live_yard(cp, pipeline.live_yard_horizon())
+
+    composition = CompositionIndex()
+    composition.set(frames["veiculo_composicao"], None)
+    df = composition.resolve(cp, depth=pipeline.COMPOSITION_DEPTH)
+
+    ref = pipeline.DimensionCache("ref", None, "PLACA_CONTROLE", pipeline.REF_COLUMNS, None)
+    ref.set(pipeline.enforce_schema(
+        frames["rank_frota"].rename(columns={"NOME_MOTORISTA": "MOTORISTA"})[pipeline.REF_COLUMNS].drop_duplicates()
+    ))
+    df = ref.left_join(df, "PLACA")
+
+    # TSC > TSCH > TSCSR per romaneio, like shipping_query
+    shipping = pipeline.DimensionCache("shipping", None, "ROMANEIO_ATUAL", pipeline.SHIPPING_COLUMNS, None)
+    tables = []
+    for name, tabela in (
+        ("tracking_shipping_code", "TSC"),
+        ("tracking_shipping_code_historico", "TSCH"),
+        ("tracking_shipping_code_sem_romaneio", "TSCSR"),
+    ):
+        tables.append(frames[name].assign(TABELA=tabela)[pipeline.SHIPPING_COLUMNS])
+    ship = pd.concat(tables, ignore_index=True).dropna(subset=["ROMANEIO_ATUAL"])
+    shipping.set(pipeline.enforce_schema(ship.drop_duplicates("ROMANEIO_ATUAL", keep="first")))
+    return pipeline.enforce_schema(shipping.left_join(df, "NUM_ROMANEIO"))
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--months", type=float, default=6)
+    parser.add_argument("--yard-size", type=int, default=400)
+    parser.add_argument("--visits-per-day", type=int, default=300)
+    parser.add_argument("--fleet", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="JSON lines file to append to")
+    args = parser.parse_args()
+
+    if args.database_url:
+        # pipeline reads DATABASE_URL at import time
+        os.environ["DATABASE_URL"] = args.database_url
+    import pandas as pd
+    import pipeline
+    import snapshot
+    from render import render_table, table_patch, table_state
+    from synthetic import generate, load_tables
+
+    folder = Path(tempfile.mkdtemp(prefix="bench_stages_"))
+    isolate_files(pipeline, folder)
+
+    frames, gen = timed(
+        lambda: generate(
+            months=args.months,
+            yard_size=args.yard_size,
+            visits_per_day=args.visits_per_day,
+            fleet=args.fleet,
+            seed=args.seed,
+        ),
+        1,
+    )
+    stages = {"generate": gen}
+
+    if args.database_url:
+        _, stages["db_load_tables"] = timed(lambda: load_tables(pipeline.get_engine(), frames), 1)
+        (df_raw, _), stages["load_data_full"] = timed(lambda: pipeline.load_data(force_full=True), 1)
+        (df_raw, _), stages["load_data_incremental"] = timed(pipeline.load_data, args.repeat)
+        source = "postgres"
+    else:
+        df_raw, stages["raw_from_frames"] = timed(lambda: raw_from_frames(pipeline, frames), 1)
+        source = "memory"
+
+    now = pd.Timestamp(datetime.now(snapshot.timezone))
+    df_static, stages["build_static_view"] = timed(lambda: snapshot.build_static_view(df_raw), args.repeat)
+    df_view, stages["apply_clock"] = timed(lambda: snapshot.apply_clock(df_static, now=now), args.repeat)
+    _, stages["write_persistent_cache"] = timed(
+        lambda: snapshot.write_persistent_cache(df_static, now, df_static["CAVALO"].nunique()), args.repeat
+    )
+    _, stages["read_persistent_cache"] = timed(snapshot.read_persistent_cache, args.repeat)
+    index, stages["build_view_index"] = timed(lambda: snapshot.build_view_index(df_static), args.repeat)
+    view = {"df": df_static, "index": index}
+    positions, stages["view_positions"] = timed(lambda: snapshot.view_positions(view, {}, False, now=now), args.repeat)
+    all_positions, stages["view_positions_all"] = timed(
+        lambda: snapshot.view_positions(view, {}, True, now=now), args.repeat
+    )
+    df_window, stages["session_rows"] = timed(lambda: snapshot.session_rows(df_static, positions, now=now), args.repeat)
+    df_all, stages["session_rows_all"] = timed(
+        lambda: snapshot.session_rows(df_static, all_positions, now=now), args.repeat
+    )
+    _, stages["view_rumo"] = timed(
+        lambda: snapshot.session_rows(df_static, snapshot.view_positions(view, {"RUMO": ["RN", "RS"]}, False, now=now), now=now),
+        args.repeat,
+    )
+    # One WINDOW_ROWS window of "Mostrar todos", as the table component asks for it
+    middle = len(all_positions) // 2
+    _, stages["session_rows_window"] = timed(
+        lambda: snapshot.session_rows(df_static, all_positions[middle : middle + 150], now=now), args.repeat
+    )
+    html, stages["render_table"] = timed(lambda: render_table(df_window), args.repeat)
+    _, stages["render_table_all"] = timed(lambda: render_table(df_all), args.repeat)
+    state, stages["table_state"] = timed(lambda: table_state(df_window), args.repeat)
+    _, stages["table_patch"] = timed(lambda: table_patch(state, table_state(df_window)), args.repeat)
+
+    result = {
+        "run_at": datetime.now(snapshot.timezone).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "source": source,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": {k: v for k, v in vars(args).items() if k not in ("database_url", "output")},
+        "rows": {
+            "controle_patio": len(frames["controle_patio"]),
+            "raw": len(df_raw),
+            "view": len(df_view),
+            "window": len(df_window),
+        },
+        "sizes": {
+            "raw_mb": round(df_raw.memory_usage(deep=True).sum() / 1e6, 2),
+            "snapshot_mb": round(snapshot.CACHE_FILE.stat().st_size / 1e6, 2),
+            "html_mb": round(len(html) / 1e6, 3),
+        },
+        "stages": stages,
+    }
+
+    with open(args.output, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(result) + "\n")
+    for name, timing in stages.items():
+        print(f"{name:<26} best {timing['best_s'] * 1000:9.1f} ms   median {timing['median_s'] * 1000:9.1f} ms")
+    print(f"appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
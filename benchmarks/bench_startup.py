@@ -0,0 +1,113 @@
+"""Measures time-to-first-paint of a new viewer when the snapshot is already on disk.
+
+    python benchmarks/bench_startup.py --yard-size 600 --repeat 5
+
+Each run is a fresh interpreter doing what the app does on a cache hit: import the
+reader modules, read the snapshot, select the 4-hour view, render the table. The
+import of the DB side (pipeline.py) is timed separately for comparison.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+DEFAULT_OUTPUT = Path(__file__).with_name("results.jsonl")
+
+# Modules that only a refresh should load
+DB_MODULES = ["pipeline", "sqlalchemy", "psycopg2", "dotenv", "queries", "bulk"]
+
+FIRST_PAINT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import snapshot, refresher, render, scheduler
+imported = time.perf_counter()
+snapshot.CACHE_FILE = refresher.CACHE_FILE = __import__("pathlib").Path({cache!r})
+cached = refresher.SnapshotRefresher().latest()
+df_window = snapshot.session_rows(cached["df"], snapshot.view_positions(cached, {{}}, show_all=False))
+html = render.render_table(df_window)
+done = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_paint_s": done - start,
+    "db_modules_loaded": [m for m in {db_modules!r} if m in sys.modules],
+}}))
+"""
+
+IMPORT_PIPELINE = """
+import sys, time
+sys.path.insert(0, {repo!r})
+import snapshot
+start = time.perf_counter()
+import pipeline
+print(time.perf_counter() - start)
+"""
+
+
+def run_child(code):
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summary(values):
+    values = sorted(values)
+    return {"best_s": round(values[0], 5), "median_s": round(values[len(values) // 2], 5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--yard-size", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="JSON lines file to append to")
+    args = parser.parse_args()
+
+    import pipeline
+    import snapshot
+    from bench_stages import git_commit, raw_from_frames
+    from synthetic import generate
+
+    # A snapshot like the one the refresher publishes, in a scratch folder
+    folder = Path(tempfile.mkdtemp(prefix="bench_startup_"))
+    snapshot.CACHE_FILE = folder / "controle_patio_cache.arrow"
+    frames = generate(months=0.5, yard_size=args.yard_size, seed=args.seed)
+    df_static = snapshot.build_static_view(raw_from_frames(pipeline, frames))
+    snapshot.write_persistent_cache(df_static, None, df_static["CAVALO"].nunique())
+
+    code = FIRST_PAINT.format(repo=str(REPO), cache=str(snapshot.CACHE_FILE), db_modules=DB_MODULES)
+    runs = [run_child(code) for _ in range(args.repeat)]
+    pipeline_import = [run_child(IMPORT_PIPELINE.format(repo=str(REPO))) for _ in range(args.repeat)]
+
+    stages = {
+        "import_reader": summary([r["import_s"] for r in runs]),
+        "first_paint": summary([r["first_paint_s"] for r in runs]),
+        "import_pipeline": summary(pipeline_import),
+    }
+    result = {
+        "run_at": datetime.now(snapshot.timezone).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "benchmark": "startup",
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "rows": {"view": len(df_static)},
+        "db_modules_loaded": runs[-1]["db_modules_loaded"],
+        "stages": stages,
+    }
+
+    with open(args.output, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(result) + "\n")
+    for name, timing in stages.items():
+        print(f"{name:<26} best {timing['best_s'] * 1000:9.1f} ms   median {timing['median_s'] * 1000:9.1f} ms")
+    print(f"DB modules loaded on first paint: {result['db_modules_loaded'] or 'none'}")
+    print(f"appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
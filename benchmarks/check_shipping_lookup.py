@@ -0,0 +1,94 @@
+"""Checks the live-mode shipping lookup against the full shipping dimension.
+
+    python benchmarks/check_shipping_lookup.py --yard-size 400
+
+The benchmarks/synthetic.py shipping tables are written to a scratch SQLite database
+(customizacoes_932 attached as a schema). NUM_ROMANEIO goes through enforce_schema as
+it does coming out of pd.read_sql (float with nulls -> nullable Int32), then:
+
+- ShippingLookupStore.missing() must hand plain ints to the :romaneios parameter;
+- ShippingLookupStore.fetch() + left_join must give every yard row the same shipping
+  columns as DimensionCache over shipping_query (the history-mode join).
+
+Exits with 1 on the first difference.
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SHIPPING_TABLES = [
+    "tracking_shipping_code",
+    "tracking_shipping_code_historico",
+    "tracking_shipping_code_sem_romaneio",
+]
+
+
+def sqlite_engine(folder, frames):
+    from sqlalchemy import create_engine, event
+
+    engine = create_engine(f"sqlite:///{folder / 'main.db'}")
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_conn, _):
+        dbapi_conn.execute(f"ATTACH DATABASE '{folder / 'customizacoes_932.db'}' AS customizacoes_932")
+
+    with engine.begin() as conn:
+        for name in SHIPPING_TABLES:
+            frames[name].to_sql(name, conn, schema="customizacoes_932", index=False)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--yard-size", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import pipeline
+    from synthetic import generate
+
+    folder = Path(tempfile.mkdtemp(prefix="check_shipping_"))
+    frames = generate(months=0.5, yard_size=args.yard_size, seed=args.seed)
+    engine = sqlite_engine(folder, frames)
+
+    yard = frames["controle_patio"][["CONTROLE_PATIO_ID", "NUM_ROMANEIO"]].copy()
+    yard["NUM_ROMANEIO"] = yard["NUM_ROMANEIO"].astype("float64")
+    yard = pipeline.enforce_schema(yard)
+    print(f"NUM_ROMANEIO dtype: {yard['NUM_ROMANEIO'].dtype}")
+
+    lookup = pipeline.ShippingLookupStore(
+        folder / "shipping_lookup.pkl", pipeline.SHIPPING_TTL, pipeline.SHIPPING_LOOKUP_RETENTION
+    )
+    romaneios = lookup.missing(yard["NUM_ROMANEIO"])
+    wrong = {type(v).__name__ for v in romaneios if type(v) is not int}
+    if wrong:
+        print(f"missing() returned {sorted(wrong)} keys, not int")
+        return 1
+
+    dimension = pipeline.DimensionCache(
+        "shipping", pipeline.shipping_query, "ROMANEIO_ATUAL", pipeline.SHIPPING_COLUMNS, None
+    )
+    with engine.connect() as conn:
+        fetched = lookup.fetch(conn, romaneios)
+        dimension.set(pipeline.read_sql_typed(pipeline.shipping_query, conn, backend="read_sql"))
+
+    live = lookup.left_join(yard, "NUM_ROMANEIO")
+    history = dimension.left_join(yard, "NUM_ROMANEIO")
+    matched = live["NEGOCIADOR"].notna().sum()
+    print(f"{len(romaneios)} romaneios asked, {len(fetched)} found, {matched} of {len(yard)} yard rows matched")
+
+    columns = ["CONTROLE_PATIO_ID", "NEGOCIADOR", "PAIS_ORIGEM_SHIPPING", "PAIS_DESTINO_SHIPPING", "TABELA"]
+    live = live[columns].astype(object).where(live[columns].notna(), None)
+    history = history[columns].astype(object).where(history[columns].notna(), None)
+    if matched == 0 or not live.equals(history):
+        print("live lookup DIFFERS from the shipping dimension")
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
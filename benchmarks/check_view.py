@@ -0,0 +1,284 @@
+"""Checks the vectorized view against the original row-wise one.
+
+    python benchmarks/check_view.py --rows 20000 --seeds 5
+
+reference_view / reference_visual_filter below are build_view_from_raw / apply_visual_filter
+as app.py had them before the vectorization (one DataFrame.apply per column), with the
+clock pinned. Each case builds a raw frame with planned exits exactly on the PRIORIDADE
+thresholds and the 4-hour limit, and compares:
+
+- snapshot.build_view_from_raw with the reference view (same rows, order and values);
+- the 4-hour window and "Mostrar todos" from the view index (view_positions /
+  view_count) with the reference apply_visual_filter;
+- each ?prioridade= view with the reference PRIORIDADE column.
+
+Exits with 1 on the first difference.
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Seconds from `now` to DATA_PREVISTA_SAIDA around each boundary (PRIORIDADE and the
+# 4-hour window), plus fractions that truncate to the boundary
+EDGE_OFFSETS = [7201, 7200.5, 7200, 7199, 1801, 1800.5, 1800, 1799, 1.5, 1, 0.5, 0, -0.5, -1, -1.5]
+
+
+# =========================
+# Reference: the original row-wise view
+# =========================
+def reference_view(df_raw, now_adjusted, timezone):
+    df = df_raw.copy()
+
+    # Dates
+    df["DATA_PREVISTA_SAIDA"] = pd.to_datetime(df["DATA_PREVISTA_SAIDA"], errors="coerce")
+    df["DATA_EFETIVA_SAIDA"] = pd.to_datetime(df["DATA_EFETIVA_SAIDA"], errors="coerce")
+    df["DATA_EFETIVA_ENTRADA"] = pd.to_datetime(df["DATA_EFETIVA_ENTRADA"], errors="coerce")
+
+    df["EXISTE_SAIDA"] = df["DATA_EFETIVA_SAIDA"].apply(
+        lambda x: "EXISTE SAIDA" if pd.notnull(x) else "SEM SAIDA"
+    )
+
+    def timezone_adjust(dt):
+        if pd.notnull(dt) and getattr(dt, "tzinfo", None) is None:
+            return timezone.localize(dt)
+        return dt
+
+    def format_duracao_segundos(T):
+        if T is None or (isinstance(T, float) and np.isnan(T)):
+            return ""
+        T = int(T)
+        sinal = "-" if T < 0 else ""
+        T = abs(T)
+        horas = T // 3600
+        minutos = (T % 3600) // 60
+        if horas > 0 and minutos > 0:
+            return f"{sinal}{horas}h {minutos}min"
+        elif horas > 0:
+            return f"{sinal}{horas}h"
+        elif minutos > 0:
+            return f"{sinal}{minutos}min"
+        return f"{sinal}0min"
+
+    def calc_tempo_desde_entrada(row):
+        if row["EXISTE_SAIDA"] != "SEM SAIDA":
+            return None
+        entrada = row["DATA_EFETIVA_ENTRADA"]
+        if pd.isnull(entrada):
+            return None
+        entrada = timezone_adjust(entrada)
+        return int((now_adjusted - entrada).total_seconds())
+
+    df["TEMPO_DESDE_ENTRADA"] = df.apply(calc_tempo_desde_entrada, axis=1)
+    df["TEMPO_ENTRADA_ATE_AGORA"] = df["TEMPO_DESDE_ENTRADA"].apply(format_duracao_segundos)
+
+    def calc_tempo_saida(row):
+        data_prevista = timezone_adjust(row["DATA_PREVISTA_SAIDA"])
+        data_efetiva = timezone_adjust(row["DATA_EFETIVA_SAIDA"])
+        if row["EXISTE_SAIDA"] == "EXISTE SAIDA":
+            referencia = data_prevista if pd.notnull(data_prevista) else data_efetiva
+            if pd.notnull(referencia) and pd.notnull(data_efetiva):
+                return int((referencia - data_efetiva).total_seconds())
+        elif pd.notnull(data_prevista):
+            return int((data_prevista - now_adjusted).total_seconds())
+        return None
+
+    df["TEMPO_ATE_SAIDA"] = df.apply(calc_tempo_saida, axis=1)
+
+    def definir_prioridade(row):
+        if pd.isnull(row["DATA_PREVISTA_SAIDA"]):
+            return "BAIXA"
+        tempo = row["TEMPO_ATE_SAIDA"]
+        if tempo is None:
+            return "BAIXA"
+        elif tempo > 7200:
+            return "NORMAL"
+        elif 1800 < tempo <= 7200:
+            return "ATENCAO"
+        elif 0 < tempo <= 1800:
+            return "URGENCIA"
+        elif tempo < 0:
+            return "CRITICA"
+        return "BAIXA"
+
+    df["PRIORIDADE"] = df.apply(definir_prioridade, axis=1)
+
+    def classificar_rumo(row):
+        origem = row.get("PAIS_ORIGEM_SHIPPING")
+        destino = row.get("PAIS_DESTINO_SHIPPING")
+        if pd.isnull(origem) or pd.isnull(destino):
+            return None
+        if origem == destino:
+            return "NAC"
+        elif destino == "Brasil":
+            return "RN"
+        else:
+            return "RS"
+
+    df["RUMO"] = df.apply(classificar_rumo, axis=1)
+
+    if "REFERENCIA" in df.columns:
+        df["REFERENCIA"] = df["REFERENCIA"].astype("string").str.upper()
+
+    if "MOTORISTA" in df.columns:
+        s = df["MOTORISTA"]
+        df["MOTORISTA"] = s.where(s.notna()).astype("string").str.strip().str.upper().str.split().str[0]
+
+    filtro_base = (
+        (df["EXISTE_SAIDA"] == "SEM SAIDA")
+        & (df["SITUACAO_ID"].isin([2, 3]))
+        & (df["DATA_PREVISTA_SAIDA"].notna())
+    )
+    df_filtrado = df[filtro_base]
+
+    nomes_alterados = {
+        "PLACA": "CAVALO",
+        "PLACA_2": "CARRETA",
+        "NEGOCIADOR": "NEGOCIADOR",
+        "RUMO": "RUMO",
+        "DATA_EFETIVA_ENTRADA": "ENTRADA",
+        "TEMPO_ENTRADA_ATE_AGORA": "TEMPO PATIO",
+        "DATA_PREVISTA_SAIDA": "PREVISAO SAIDA",
+        "PRIORIDADE": "PRIORIDADE",
+        "MOTORISTA": "MOTORISTA",
+        "REFERENCIA": "REFERENCIA ATUAL",
+    }
+    df_exibir = df_filtrado[list(nomes_alterados)].rename(columns=nomes_alterados).copy()
+    df_exibir["_TEMPO_ATE_SAIDA_SEG"] = pd.to_numeric(df_filtrado["TEMPO_ATE_SAIDA"], errors="coerce")
+
+    df_exibir["ENTRADA"] = pd.to_datetime(df_exibir["ENTRADA"], errors="coerce").dt.strftime("%d/%m/%y %H:%M")
+    df_exibir["PREVISAO SAIDA"] = pd.to_datetime(df_exibir["PREVISAO SAIDA"], errors="coerce").dt.strftime(
+        "%d/%m/%y %H:%M"
+    )
+
+    sort_key = pd.to_datetime(df_exibir["PREVISAO SAIDA"], format="%d/%m/%y %H:%M", errors="coerce")
+    df_exibir["_sort"] = sort_key
+    df_exibir = df_exibir.sort_values("_sort").drop(columns="_sort")
+
+    return df_exibir.fillna("").replace("None", "")
+
+
+def reference_visual_filter(df_base, show_all, limite_segundos):
+    df = df_base.copy()
+    if not show_all:
+        tempo_seg = pd.to_numeric(df["_TEMPO_ATE_SAIDA_SEG"], errors="coerce")
+        df = df[tempo_seg <= limite_segundos]
+    qtd_placas = df["CAVALO"].nunique()
+    return df.drop(columns=["_TEMPO_ATE_SAIDA_SEG"]), qtd_placas
+
+
+# =========================
+# Cases
+# =========================
+def make_raw(rows, seed, now, limite_segundos):
+    # Naive Sao Paulo timestamps, like the DB returns them. The first rows sit on the
+    # edges and stay in the yard (SEM SAIDA, SITUACAO_ID 2)
+    rng = np.random.default_rng(seed)
+    edges = EDGE_OFFSETS + [limite_segundos + 1, limite_segundos + 0.5, limite_segundos, limite_segundos - 1]
+
+    entrada = [now - timedelta(seconds=int(s)) for s in rng.integers(0, 3 * 86400, rows)]
+    entrada = [None if rng.random() < 0.05 else e for e in entrada]
+    prevista = [now + timedelta(seconds=int(s)) for s in rng.integers(-20000, 40000, rows)]
+    prevista = [None if rng.random() < 0.1 else p for p in prevista]
+    saida = [None if rng.random() < 0.6 else now - timedelta(seconds=int(s)) for s in rng.integers(0, 86400, rows)]
+    situacao = rng.integers(1, 5, rows)
+    for i, offset in enumerate(edges[:rows]):
+        prevista[i], saida[i], situacao[i] = now + timedelta(seconds=offset), None, 2
+
+    paises = np.array(["Brasil", "Argentina", "Chile", None], dtype=object)
+    return pd.DataFrame({
+        "CONTROLE_PATIO_ID": np.arange(rows),
+        "DATA_PREVISTA_SAIDA": pd.to_datetime(pd.Series(prevista, dtype=object)),
+        "DATA_EFETIVA_SAIDA": pd.to_datetime(pd.Series(saida, dtype=object)),
+        "DATA_EFETIVA_ENTRADA": pd.to_datetime(pd.Series(entrada, dtype=object)),
+        "SITUACAO_ID": situacao,
+        "NUM_ROMANEIO": rng.integers(1000, 2000, rows),
+        "PLACA": [f"ABC{i % 400:04d}" for i in range(rows)],
+        "PLACA_2": [None if i % 7 == 0 else f"CAR{i % 300:04d}" for i in range(rows)],
+        "PLACA_3": [None] * rows,
+        "REFERENCIA": [None if i % 5 == 0 else f"ref loja {i % 30}" for i in range(rows)],
+        "MOTORISTA": [None if i % 6 == 0 else f"  joao{i % 20} da silva " for i in range(rows)],
+        "NEGOCIADOR": [None if i % 9 == 0 else f"NEG {i % 12}" for i in range(rows)],
+        "PAIS_ORIGEM_SHIPPING": paises[rng.integers(0, 4, rows)],
+        "PAIS_DESTINO_SHIPPING": paises[rng.integers(0, 4, rows)],
+    })
+
+
+def cases(args, snapshot):
+    # (name, raw frame, clock). The clock has microseconds, so whole-second
+    # offsets from the raw `now` land between ticks like they do live
+    raw_now = datetime(2026, 3, 30, 9, 30)
+    clocks = [
+        snapshot.timezone.localize(raw_now),
+        snapshot.timezone.localize(raw_now.replace(microsecond=123456)),
+    ]
+    for seed in range(args.seeds):
+        raw = make_raw(args.rows, seed, raw_now, snapshot.LIMITE_SEGUNDOS)
+        yield f"seed {seed}", raw, clocks[seed % 2]
+
+    aware = make_raw(args.rows, args.seeds, raw_now, snapshot.LIMITE_SEGUNDOS)
+    aware["DATA_EFETIVA_ENTRADA"] = aware["DATA_EFETIVA_ENTRADA"].dt.tz_localize(snapshot.timezone)
+    yield "tz-aware entrada", aware, clocks[1]
+
+    empty = make_raw(args.rows, args.seeds, raw_now, snapshot.LIMITE_SEGUNDOS)
+    empty["DATA_EFETIVA_SAIDA"] = empty["DATA_EFETIVA_ENTRADA"].fillna(pd.Timestamp(raw_now))
+    yield "empty yard", empty, clocks[0]
+
+
+def compare(name, raw, now, pipeline, snapshot):
+    expected = reference_view(raw, now, snapshot.timezone)
+    typed = pipeline.enforce_schema(raw.copy())
+    actual = snapshot.build_view_from_raw(typed, now=now)
+
+    # _TEMPO_ATE_SAIDA_SEG: the reference dtype depends on the raw data (float64 as soon
+    # as any raw row has no tempo, int64 otherwise); the values must match. Columns of
+    # an empty view have no values to infer a dtype from, so only their names count
+    tempo = "_TEMPO_ATE_SAIDA_SEG"
+    pd.testing.assert_frame_equal(
+        expected.drop(columns=tempo), actual.drop(columns=tempo), check_dtype=not expected.empty
+    )
+    assert actual[tempo].dtype == "int64", actual[tempo].dtype
+    np.testing.assert_array_equal(expected[tempo].to_numpy(dtype="float64"), actual[tempo].to_numpy(dtype="float64"))
+
+    df_static = snapshot.build_static_view(typed)
+    view = {"df": df_static, "index": snapshot.build_view_index(df_static)}
+    for show_all in (False, True):
+        rows, qtd_placas = reference_visual_filter(expected, show_all, snapshot.LIMITE_SEGUNDOS)
+        positions = snapshot.view_positions(view, {}, show_all, now=now)
+        assert df_static.index[positions].tolist() == rows.index.tolist(), f"show_all={show_all}: rows"
+        assert snapshot.view_count(view, positions) == qtd_placas, f"show_all={show_all}: qtd_placas"
+
+    for prioridade in snapshot.PRIORITY_RANGES:
+        positions = snapshot.view_positions(view, {"PRIORIDADE": [prioridade]}, True, now=now)
+        expected_rows = expected.index[expected["PRIORIDADE"] == prioridade].tolist()
+        assert df_static.index[positions].tolist() == expected_rows, f"prioridade={prioridade}"
+
+    counts = expected["PRIORIDADE"].value_counts().to_dict()
+    print(f"{name:<18} ok  {len(expected):>6} rows  {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    import pipeline
+    import snapshot
+
+    for name, raw, now in cases(args, snapshot):
+        try:
+            compare(name, raw, now, pipeline, snapshot)
+        except AssertionError as e:
+            print(f"{name:<18} DIFFERS\n{e}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
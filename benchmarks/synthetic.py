@@ -0,0 +1,225 @@
+import io
+import string
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# Synthetic datalake tables for the benchmarks
+# =========================
+# Only point DATABASE_URL at a scratch database: load_tables() drops and recreates
+# the tables it writes.
+
+# "schema.table" -> generated frame columns are the table columns, in order
+TABLES = {
+    "almoxarifado.equipamento": "equipamento",
+    "manutencao.controle_patio": "controle_patio",
+    "veiculo.veiculo_composicao": "veiculo_composicao",
+    "oper.rank_frota": "rank_frota",
+    "customizacoes_932.tracking_shipping_code": "tracking_shipping_code",
+    "customizacoes_932.tracking_shipping_code_historico": "tracking_shipping_code_historico",
+    "customizacoes_932.tracking_shipping_code_sem_romaneio": "tracking_shipping_code_sem_romaneio",
+}
+
+# Indexes matching the filters of queries.py
+INDEXES = {
+    "manutencao.controle_patio": ["EQUIPAMENTO_ID", "DATE_INSERT", "DATE_UPDATE"],
+    "veiculo.veiculo_composicao": ["PLACA_1", "DATA_HORA_ENGATE", "DATA_HORA_DESENGATE"],
+    "customizacoes_932.tracking_shipping_code": ["ROMANEIO_ATUAL"],
+    "customizacoes_932.tracking_shipping_code_historico": ["ROMANEIO_ATUAL"],
+    "customizacoes_932.tracking_shipping_code_sem_romaneio": ["ROMANEIO_ATUAL"],
+}
+
+PAISES = ["Brasil", "Chile", "Argentina", "Uruguai", "Paraguai", "Peru"]
+
+
+def make_plates(n, prefix=""):
+    # Mercosul-like plates (AAA0A00), unique per index
+    letters = string.ascii_uppercase
+    return [
+        f"{prefix}{letters[i // 676 % 26]}{letters[i // 26 % 26]}{letters[i % 26]}"
+        f"{i // 17576 % 10}{letters[i // 175760 % 26]}{i % 100:02d}"
+        for i in range(n)
+    ]
+
+
+def generate(months=6, yard_size=400, visits_per_day=300, fleet=1500, seed=0, now=None):
+    # {table name: DataFrame}. History spans `months` back from `now`; yard_size rows
+    # are still in the yard (no DATA_EFETIVA_SAIDA, SITUACAO_ID 2/3) around now.
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp(now or datetime.now()).floor("s").tz_localize(None)
+
+    # Cavalos first, then carretas
+    plates = make_plates(fleet * 3)
+    equipamento = pd.DataFrame(
+        {"EQUIPAMENTO_ID": np.arange(1, len(plates) + 1), "COD_EQUIPAMENTO": plates}
+    )
+
+    n_hist = int(months * 30 * visits_per_day)
+    span = int(timedelta(days=months * 30).total_seconds())
+    entrada = now - pd.to_timedelta(rng.integers(3600 * 48, span, n_hist), unit="s")
+    saida = entrada + pd.to_timedelta(rng.integers(1800, 3600 * 36, n_hist), unit="s")
+    historico = pd.DataFrame(
+        {
+            "DATA_EFETIVA_ENTRADA": entrada,
+            "DATA_EFETIVA_SAIDA": saida,
+            "DATA_PREVISTA_SAIDA": saida + pd.to_timedelta(rng.integers(-7200, 7200, n_hist), unit="s"),
+            "SITUACAO_ID": rng.choice([4, 5], n_hist, p=[0.95, 0.05]),
+        }
+    )
+
+    # Active yard: planned exits from 2h ago to 12h ahead
+    entrada_patio = now - pd.to_timedelta(rng.integers(600, 3600 * 30, yard_size), unit="s")
+    patio = pd.DataFrame(
+        {
+            "DATA_EFETIVA_ENTRADA": entrada_patio,
+            "DATA_EFETIVA_SAIDA": pd.NaT,
+            "DATA_PREVISTA_SAIDA": now + pd.to_timedelta(rng.integers(-7200, 3600 * 12, yard_size), unit="s"),
+            "SITUACAO_ID": rng.choice([2, 3], yard_size),
+        }
+    )
+
+    cp = pd.concat([historico, patio], ignore_index=True).sort_values("DATA_EFETIVA_ENTRADA")
+    n = len(cp)
+    cp.insert(0, "CONTROLE_PATIO_ID", np.arange(1, n + 1))
+    cp["DATE_INSERT"] = cp["DATA_EFETIVA_ENTRADA"] - pd.to_timedelta(rng.integers(0, 3600 * 24, n), unit="s")
+    cp["DATE_UPDATE"] = cp["DATA_EFETIVA_SAIDA"].fillna(cp["DATA_EFETIVA_ENTRADA"])
+    cp["DATA_PREVISTA_ENTRADA"] = cp["DATE_INSERT"] + pd.to_timedelta(rng.integers(0, 3600 * 12, n), unit="s")
+    # Some yard visits carry no romaneio
+    cp["NUM_ROMANEIO"] = pd.array(rng.integers(100_000, 100_000 + n, n), dtype="Int64")
+    cp.loc[rng.random(n) < 0.1, "NUM_ROMANEIO"] = pd.NA
+    cp["EQUIPAMENTO_ID"] = rng.integers(1, fleet + 1, n)
+
+    controle_patio = cp[
+        [
+            "CONTROLE_PATIO_ID",
+            "DATE_INSERT",
+            "DATE_UPDATE",
+            "DATA_PREVISTA_ENTRADA",
+            "DATA_PREVISTA_SAIDA",
+            "DATA_EFETIVA_ENTRADA",
+            "DATA_EFETIVA_SAIDA",
+            "SITUACAO_ID",
+            "NUM_ROMANEIO",
+            "EQUIPAMENTO_ID",
+        ]
+    ].reset_index(drop=True)
+
+    frames = {"equipamento": equipamento, "controle_patio": controle_patio}
+    frames["veiculo_composicao"] = _composicao(rng, plates, fleet, months, now)
+    frames["rank_frota"] = _rank_frota(rng, plates[:fleet], now)
+    frames.update(_shipping(rng, controle_patio, now))
+    return frames
+
+
+def _composicao(rng, plates, fleet, months, now):
+    # Back-to-back engate intervals per cavalo over the history; the current one is
+    # still open. A third of the carretas pull a second trailer (PLACA_3 in the view).
+    start = now - timedelta(days=months * 30 + 30)
+    rows = []
+    for cavalo in range(fleet):
+        t = start + timedelta(seconds=int(rng.integers(0, 3600 * 24 * 10)))
+        while t < now:
+            fim = t + timedelta(seconds=int(rng.integers(3600 * 24, 3600 * 24 * 20)))
+            carreta = fleet + int(rng.integers(0, fleet))
+            rows.append((plates[cavalo], plates[carreta], t, fim if fim < now else None))
+            if carreta % 3 == 0:
+                rows.append((plates[carreta], plates[2 * fleet + carreta - fleet], t, fim if fim < now else None))
+            t = fim + timedelta(seconds=int(rng.integers(60, 3600 * 12)))
+    return pd.DataFrame(rows, columns=["PLACA_1", "PLACA_2", "DATA_HORA_ENGATE", "DATA_HORA_DESENGATE"])
+
+
+def _rank_frota(rng, cavalos, now):
+    n = len(cavalos)
+    return pd.DataFrame(
+        {
+            "PLACA_CONTROLE": cavalos,
+            "REFERENCIA": [f"Ref {i % 40}" for i in rng.integers(0, 1000, n).tolist()],
+            "NOME_MOTORISTA": [f"Motorista {i} Silva" for i in range(n)],
+            "DIA": now.normalize(),
+        }
+    )
+
+
+def _shipping(rng, controle_patio, now):
+    # Open romaneios (still in the yard) in TSC, closed ones in TSCH, plus shipping
+    # codes without romaneio in TSCSR
+    romaneios = controle_patio[["NUM_ROMANEIO", "DATA_EFETIVA_SAIDA", "DATA_EFETIVA_ENTRADA"]].dropna(
+        subset=["NUM_ROMANEIO"]
+    )
+    aberto = romaneios["DATA_EFETIVA_SAIDA"].isna()
+
+    def frame(rows, romaneio, start_id, inicio=None):
+        n = len(rows)
+        origem = rng.choice(PAISES, n, p=[0.6, 0.1, 0.1, 0.1, 0.05, 0.05])
+        destino = rng.choice(PAISES, n, p=[0.4, 0.2, 0.2, 0.1, 0.05, 0.05])
+        df = pd.DataFrame(
+            {
+                "SHIPPING_CODE_ID": np.arange(start_id, start_id + n),
+                "NEGOCIADOR": [f"NEGOCIADOR {i}" for i in rng.integers(0, 25, n).tolist()],
+                "PAIS_ORIGEM_SHIPPING": origem,
+                "PAIS_DESTINO_SHIPPING": destino,
+                "ROMANEIO_ATUAL": romaneio,
+            }
+        )
+        if inicio is not None:
+            df["DATA_INICIO_CARGA"] = inicio
+        return df
+
+    tsc = frame(romaneios[aberto], romaneios.loc[aberto, "NUM_ROMANEIO"].to_numpy(), 1)
+    fechados = romaneios[~aberto]
+    tsch = frame(
+        fechados, fechados["NUM_ROMANEIO"].to_numpy(), 1 + len(tsc), fechados["DATA_EFETIVA_ENTRADA"].to_numpy()
+    )
+    n_sr = max(len(tsc) // 4, 1)
+    tscsr = frame(
+        range(n_sr),
+        pd.array([None] * n_sr, dtype="Int64"),
+        1 + len(tsc) + len(tsch),
+        now - pd.to_timedelta(rng.integers(0, 3600 * 24 * 30, n_sr), unit="s"),
+    )
+    return {
+        "tracking_shipping_code": tsc,
+        "tracking_shipping_code_historico": tsch,
+        "tracking_shipping_code_sem_romaneio": tscsr,
+    }
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "timestamp"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "bigint"
+    if pd.api.types.is_float_dtype(dtype):
+        return "double precision"
+    return "text"
+
+
+def load_tables(engine, frames):
+    # DROP + CREATE + COPY FROM STDIN for every generated table
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            for table, key in TABLES.items():
+                if key not in frames:
+                    continue
+                df = frames[key]
+                schema = table.split(".")[0]
+                columns = ", ".join(f'"{c}" {_sql_type(df[c].dtype)}' for c in df.columns)
+                cur.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
+                cur.execute(f"CREATE TABLE {table} ({columns})")
+
+                buf = io.StringIO()
+                df.to_csv(buf, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+                buf.seek(0)
+                names = ", ".join(f'"{c}"' for c in df.columns)
+                cur.copy_expert(f"COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)", buf)
+
+                for col in INDEXES.get(table, []):
+                    cur.execute(f'CREATE INDEX ON {table} ("{col}")')
+                cur.execute(f"ANALYZE {table}")
+        raw.commit()
+    finally:
+        raw.close()
@@ -0,0 +1,84 @@
+import csv
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+# COPY output kept in memory up to this size, spilled to a temp file beyond it
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# Bytes parsed per Arrow CSV block (roughly READ_CHUNKSIZE rows of controle_patio)
+BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _literal_sql(sql, conn, params):
+    # COPY takes no bind parameters: compile the SQLAlchemy text (expanding IN lists
+    # included) and let psycopg2 quote the values
+    stmt = sql if isinstance(sql, TextClause) else text(sql)
+    if params:
+        stmt = stmt.bindparams(**params)
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    query = str(compiled).strip().rstrip(";")
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        return cursor.mogrify(query, compiled.params).decode("utf-8"), cursor
+    except Exception:
+        cursor.close()
+        raise
+
+
+def _read_header(spool):
+    spool.seek(0)
+    line = spool.readline().decode("utf-8")
+    spool.seek(0)
+    return next(csv.reader([line]), [])
+
+
+def copy_chunks(sql, conn, params=None, int_columns=(), block_size=BLOCK_SIZE):
+    # Streams `COPY (sql) TO STDOUT` as CSV and yields DataFrames block by block.
+    # Columns come out as text (int_columns as int64) for enforce_schema to type;
+    # NULL and '' stay distinct like in pd.read_sql.
+    query, cursor = _literal_sql(sql, conn, params)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        try:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", spool)
+        finally:
+            cursor.close()
+
+        header = _read_header(spool)
+        if not header:
+            return
+        column_types = {c: (pa.int64() if c in int_columns else pa.string()) for c in header}
+        reader = pa_csv.open_csv(
+            spool,
+            read_options=pa_csv.ReadOptions(block_size=block_size),
+            convert_options=pa_csv.ConvertOptions(
+                column_types=column_types,
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        empty = True
+        for batch in reader:
+            empty = False
+            yield batch.to_pandas()
+        if empty:
+            yield pa.Table.from_batches([], schema=reader.schema).to_pandas()
+
+
+def cursor_chunks(sql, conn, params=None, chunksize=50_000):
+    # Named (server-side) cursor: rows arrive chunksize at a time instead of all at once
+    stmt = sql if isinstance(sql, TextClause) else text(sql)
+    result = conn.execute(
+        stmt.execution_options(stream_results=True, max_row_buffer=chunksize), params or {}
+    )
+    columns = list(result.keys())
+    empty = True
+    for rows in result.partitions(chunksize):
+        empty = False
+        yield pd.DataFrame.from_records(rows, columns=columns)
+    if empty:
+        yield pd.DataFrame(columns=columns)
@@ -0,0 +1,130 @@
+import threading
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+COMPOSITION_COLUMNS = ["PLACA_1", "PLACA_2", "DATA_HORA_ENGATE", "DATA_HORA_DESENGATE"]
+COMPOSITION_KEY = ["PLACA_1", "PLACA_2", "DATA_HORA_ENGATE"]
+
+# Open intervals (no DATA_HORA_DESENGATE yet) never end
+_OPEN_END = np.iinfo(np.int64).max
+_NAT = np.iinfo(np.int64).min
+
+
+def _to_ns(values):
+    # Naive local timestamps, as stored in the datalake, as int64 nanoseconds (NaT -> _NAT)
+    s = pd.to_datetime(pd.Series(values), errors="coerce")
+    if s.dt.tz is not None:
+        s = s.dt.tz_localize(None)
+    return s.to_numpy(dtype="datetime64[ns]").astype("int64")
+
+
+class CompositionIndex:
+    # Engate/desengate intervals of veiculo_composicao, indexed per PLACA_1 and sorted
+    # by engate. Answers "which trailer was hitched to this plate at time T" like the
+    # old BETWEEN DATA_HORA_ENGATE AND COALESCE(DATA_HORA_DESENGATE, NOW()) join; when
+    # several intervals match, the most recent engate wins.
+
+    def __init__(self, path=None):
+        self.path = path
+        self.df = pd.DataFrame(columns=COMPOSITION_COLUMNS)
+        self.watermark = None
+        self.loaded_at = None
+        # True while a fetch + set/upsert runs (see pipeline._fetch_composition)
+        self.loading = False
+        self._by_plate = {}
+        self._lock = threading.Lock()
+        self._restored = False
+
+    def restore(self):
+        # Seed from disk once per process
+        if self._restored or self.path is None:
+            return
+        self._restored = True
+        if self.path.exists():
+            try:
+                payload = pd.read_pickle(self.path)
+                self._publish(payload["df"], payload.get("loaded_at"))
+            except Exception:
+                pass
+
+    def persist(self):
+        if self.path is not None:
+            pd.to_pickle({"df": self.df, "loaded_at": self.loaded_at}, self.path)
+
+    def set(self, df, loaded_at):
+        self._publish(df[COMPOSITION_COLUMNS].reset_index(drop=True), loaded_at)
+
+    def upsert(self, df_delta):
+        if df_delta.empty:
+            return
+        df = pd.concat([self.df, df_delta[COMPOSITION_COLUMNS]], ignore_index=True)
+        df = df.drop_duplicates(subset=COMPOSITION_KEY, keep="last").reset_index(drop=True)
+        self._publish(df, self.loaded_at)
+
+    def _publish(self, df, loaded_at):
+        by_plate = self._build(df)
+        engate = pd.to_datetime(df["DATA_HORA_ENGATE"], errors="coerce")
+        desengate = pd.to_datetime(df["DATA_HORA_DESENGATE"], errors="coerce")
+        watermark = max((v for v in (engate.max(), desengate.max()) if pd.notna(v)), default=None)
+        with self._lock:
+            self.df, self._by_plate = df, by_plate
+            self.watermark, self.loaded_at = watermark, loaded_at
+
+    @staticmethod
+    def _build(df):
+        df = df.dropna(subset=["PLACA_1", "PLACA_2", "DATA_HORA_ENGATE"])
+        starts = _to_ns(df["DATA_HORA_ENGATE"])
+        ends = _to_ns(df["DATA_HORA_DESENGATE"])
+        ends[ends == _NAT] = _OPEN_END
+        plates = df["PLACA_1"].tolist()
+        trailers = df["PLACA_2"].tolist()
+
+        grouped = {}
+        for i in np.argsort(starts, kind="stable").tolist():
+            grouped.setdefault(plates[i], []).append((int(starts[i]), int(ends[i]), trailers[i]))
+
+        by_plate = {}
+        for plate, intervals in grouped.items():
+            plate_starts = [start for start, _, _ in intervals]
+            plate_ends = [end for _, end, _ in intervals]
+            # Running max of the ends bounds the backwards scan when intervals overlap
+            max_ends = np.maximum.accumulate(np.array(plate_ends, dtype=np.int64)).tolist()
+            by_plate[plate] = (plate_starts, plate_ends, max_ends, [t for _, _, t in intervals])
+        return by_plate
+
+    def trailer_at(self, plate, t):
+        entry = self._by_plate.get(plate)
+        if entry is None or t == _NAT:
+            return None
+        starts, ends, max_ends, trailers = entry
+        j = bisect_right(starts, t) - 1
+        while j >= 0 and max_ends[j] >= t:
+            if ends[j] >= t:
+                return trailers[j]
+            j -= 1
+        return None
+
+    def chain(self, plate, t, length):
+        # cavalo -> carreta -> 3rd plate -> ...; stops on a gap or a cycle
+        result, seen = [], {plate}
+        current = plate
+        for _ in range(length):
+            current = self.trailer_at(current, t)
+            if current is None or current in seen:
+                break
+            result.append(current)
+            seen.add(current)
+        return result
+
+    def resolve(self, df, depth=2, plate_col="PLACA", time_col="DATA_EFETIVA_ENTRADA"):
+        # Adds PLACA_2 .. PLACA_{depth + 1}
+        times = _to_ns(df[time_col]).tolist()
+        columns = [[None] * len(df) for _ in range(depth)]
+        for i, (plate, t) in enumerate(zip(df[plate_col].tolist(), times)):
+            if plate is None or (isinstance(plate, float) and np.isnan(plate)):
+                continue
+            for k, trailer in enumerate(self.chain(plate, t, depth)):
+                columns[k][i] = trailer
+        return df.assign(**{f"PLACA_{k + 2}": columns[k] for k in range(depth)})
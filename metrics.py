@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger("controle_patio.metrics")
+
+# Prometheus textfile (node_exporter textfile collector format), rewritten by
+# refresh_snapshot after every snapshot refresh with the stages of the process that
+# refreshed; METRICS_FILE="" disables it
+METRICS_FILE = os.getenv("METRICS_FILE", str(Path(__file__).with_name("controle_patio_metrics.prom")))
+
+# Level of the stage log lines in the app (see configure_logging); "" disables them
+METRICS_LOG_LEVEL = os.getenv("METRICS_LOG_LEVEL", "INFO")
+
+PREFIX = "controle_patio_stage"
+
+
+class StageMetrics:
+    # Per-stage counters for this process: last duration/rows/bytes, totals, errors
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, rows=None, nbytes=None, error=False):
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                entry = self._stages[name] = {
+                    "runs": 0,
+                    "errors": 0,
+                    "seconds_total": 0.0,
+                    "last_seconds": None,
+                    "last_rows": None,
+                    "last_bytes": None,
+                    "last_at": None,
+                }
+            entry["runs"] += 1
+            entry["errors"] += int(error)
+            entry["seconds_total"] += seconds
+            entry["last_seconds"] = seconds
+            entry["last_at"] = time.time()
+            if rows is not None:
+                entry["last_rows"] = rows
+            if nbytes is not None:
+                entry["last_bytes"] = nbytes
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stages.items()}
+
+    def to_prometheus(self):
+        stages = self.snapshot()
+        series = [
+            ("seconds", "gauge", "Duration of the last run of the stage", "last_seconds"),
+            ("seconds_total", "counter", "Time spent in the stage since start", "seconds_total"),
+            ("runs_total", "counter", "Runs of the stage since start", "runs"),
+            ("errors_total", "counter", "Runs of the stage that raised", "errors"),
+            ("rows", "gauge", "Rows handled by the last run of the stage", "last_rows"),
+            ("bytes", "gauge", "Bytes handled by the last run of the stage", "last_bytes"),
+            ("last_run_timestamp_seconds", "gauge", "Unix time of the last run of the stage", "last_at"),
+        ]
+        lines = []
+        for suffix, kind, help_text, key in series:
+            metric = f"{PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name in sorted(stages):
+                value = stages[name][key]
+                if value is not None:
+                    lines.append(f'{metric}{{stage="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=METRICS_FILE):
+        if not path:
+            return
+        # Atomic replace so the collector never reads a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+METRICS = StageMetrics()
+
+
+def configure_logging(level=METRICS_LOG_LEVEL):
+    # Streamlit only sets up handlers for its own loggers, so without this the stage
+    # records are dropped in the app. Idempotent: the script runs again on every rerun
+    if not level or any(getattr(h, "_controle_patio", False) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    handler._controle_patio = True
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    # Not to the root logger as well, in case something configures it later
+    logger.propagate = False
+
+
+@contextmanager
+def stage(name, **fields):
+    # Times the block; the caller may set rows / bytes (and extra log fields) on the
+    # yielded dict. One structured log line per run.
+    info = {"rows": None, "bytes": None, **fields}
+    start = time.perf_counter()
+    error = False
+    try:
+        yield info
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        METRICS.record(name, seconds, rows=info["rows"], nbytes=info["bytes"], error=error)
+        payload = {"stage": name, "seconds": round(seconds, 4), "error": error}
+        payload.update({k: v for k, v in info.items() if v is not None})
+        logger.info(json.dumps(payload, default=str))
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else None
@@ -1,7 +1,7 @@
-main_query = """
-        WITH cpv AS (
+_controle_patio_template = """
             SELECT
                 cp."DATE_INSERT",
+                cp."DATE_UPDATE",
                 cp."CONTROLE_PATIO_ID",
                 cp."DATA_PREVISTA_ENTRADA",
                 cp."DATA_PREVISTA_SAIDA",
@@ -15,6 +15,10 @@ main_query = """
             JOIN almoxarifado.equipamento e
               ON cp."EQUIPAMENTO_ID" = e."EQUIPAMENTO_ID"
             WHERE cp."DATE_INSERT" >= '2024-08-01'
+            {extra_filter}"""
+# Full history since 2024-08-01 with PLACA_2 / PLACA_3 resolved in SQL (analytics)
+main_query = """
+        WITH cpv AS ({controle_patio}
         ),
         completo AS (
             SELECT cpv.*, vc."PLACA_2"
@@ -28,6 +32,55 @@ main_query = """
         LEFT JOIN veiculo.veiculo_composicao vc
           ON completo."PLACA_2" = vc."PLACA_1"
          AND completo."DATA_EFETIVA_ENTRADA" BETWEEN vc."DATA_HORA_ENGATE" AND COALESCE(vc."DATA_HORA_DESENGATE", NOW());
+    """.format(controle_patio=_controle_patio_template.format(extra_filter=""))
+
+# The dashboard loader reads controle_patio without the composition joins;
+# PLACA_2 / PLACA_3 come from the in-memory interval index (composition.py)
+controle_patio_query = _controle_patio_template.format(extra_filter="")
+# Only rows inserted or updated since the last watermark (incremental refresh)
+controle_patio_delta_query = _controle_patio_template.format(
+    extra_filter='AND (cp."DATE_UPDATE" >= :since OR cp."DATE_INSERT" >= :since)'
+)
+# Live yard: vehicles still in the yard with a planned exit
+# (same predicates as the base filter of the dashboard)
+_live_yard_filter = """AND cp."DATA_EFETIVA_SAIDA" IS NULL
+            AND cp."SITUACAO_ID" IN (2, 3)
+            AND cp."DATA_PREVISTA_SAIDA" IS NOT NULL"""
+live_yard_query = _controle_patio_template.format(extra_filter=_live_yard_filter)
+# Live yard limited to planned exits up to :horizon_until (local time)
+live_yard_horizon_query = _controle_patio_template.format(
+    extra_filter=_live_yard_filter + """
+            AND cp."DATA_PREVISTA_SAIDA" <= :horizon_until"""
+)
+# Engate/desengate intervals that can still match a controle_patio row since 2024-08-01
+composition_query = """
+        SELECT vc."PLACA_1", vc."PLACA_2", vc."DATA_HORA_ENGATE", vc."DATA_HORA_DESENGATE"
+        FROM veiculo.veiculo_composicao vc
+        WHERE vc."DATA_HORA_DESENGATE" IS NULL OR vc."DATA_HORA_DESENGATE" >= '2024-08-01';
+    """
+# Intervals opened or closed since the last watermark
+composition_delta_query = """
+        SELECT vc."PLACA_1", vc."PLACA_2", vc."DATA_HORA_ENGATE", vc."DATA_HORA_DESENGATE"
+        FROM veiculo.veiculo_composicao vc
+        WHERE vc."DATA_HORA_ENGATE" >= :since OR vc."DATA_HORA_DESENGATE" >= :since;
+    """
+last_update_query = """
+        SELECT MAX(cp."DATE_UPDATE") AS last_update
+        FROM manutencao.controle_patio cp;
+    """
+# Change-detection probe: one row of watermarks for every table the snapshot reads.
+# Each subquery is a single MAX (no table counts), so the probe is cheap enough
+# to poll often. Shipping tables have no update timestamp; new rows show up in the ids.
+watermark_probe_query = """
+        SELECT
+            (SELECT MAX(cp."DATE_UPDATE") FROM manutencao.controle_patio cp) AS "CONTROLE_PATIO_UPDATE",
+            (SELECT MAX(cp."DATE_INSERT") FROM manutencao.controle_patio cp) AS "CONTROLE_PATIO_INSERT",
+            (SELECT MAX(vc."DATA_HORA_ENGATE") FROM veiculo.veiculo_composicao vc) AS "COMPOSICAO_ENGATE",
+            (SELECT MAX(vc."DATA_HORA_DESENGATE") FROM veiculo.veiculo_composicao vc) AS "COMPOSICAO_DESENGATE",
+            (SELECT MAX(rf."DIA") FROM oper.rank_frota rf) AS "RANK_FROTA_DIA",
+            (SELECT MAX("SHIPPING_CODE_ID") FROM customizacoes_932.tracking_shipping_code) AS "TSC_MAX_ID",
+            (SELECT MAX("SHIPPING_CODE_ID") FROM customizacoes_932.tracking_shipping_code_historico) AS "TSCH_MAX_ID",
+            (SELECT MAX("SHIPPING_CODE_ID") FROM customizacoes_932.tracking_shipping_code_sem_romaneio) AS "TSCSR_MAX_ID";
     """
 ref_query = """
         SELECT DISTINCT rf."PLACA_CONTROLE", rf."REFERENCIA", rf."NOME_MOTORISTA" as "MOTORISTA"
@@ -87,3 +140,60 @@ shipping_query = """
         WHERE rn = 1 AND "ROMANEIO_ATUAL" IS NOT NULL
         ORDER BY "ROMANEIO_ATUAL";
     """
+# Shipping info only for the given romaneios (expanding :romaneios), with the same
+# TSC > TSCH > TSCSR precedence as shipping_query
+shipping_lookup_query = """
+        WITH CombinedData AS (
+            SELECT
+                "SHIPPING_CODE_ID",
+                "NEGOCIADOR",
+                "PAIS_ORIGEM_SHIPPING",
+                "PAIS_DESTINO_SHIPPING",
+                "ROMANEIO_ATUAL",
+                'TSC' AS "TABELA"
+            FROM customizacoes_932.tracking_shipping_code
+            WHERE "ROMANEIO_ATUAL" IN :romaneios
+            UNION ALL
+            SELECT
+                "SHIPPING_CODE_ID",
+                "NEGOCIADOR",
+                "PAIS_ORIGEM_SHIPPING",
+                "PAIS_DESTINO_SHIPPING",
+                "ROMANEIO_ATUAL",
+                'TSCH' AS "TABELA"
+            FROM customizacoes_932.tracking_shipping_code_historico
+            WHERE "DATA_INICIO_CARGA" >= '2024-08-01'
+              AND "ROMANEIO_ATUAL" IN :romaneios
+            UNION ALL
+            SELECT
+                "SHIPPING_CODE_ID",
+                "NEGOCIADOR",
+                "PAIS_ORIGEM_SHIPPING",
+                "PAIS_DESTINO_SHIPPING",
+                "ROMANEIO_ATUAL",
+                'TSCSR' AS "TABELA"
+            FROM customizacoes_932.tracking_shipping_code_sem_romaneio
+            WHERE "DATA_INICIO_CARGA" >= '2024-08-01'
+              AND "ROMANEIO_ATUAL" IN :romaneios
+        ),
+        RankedData AS (
+            SELECT
+                "SHIPPING_CODE_ID",
+                "NEGOCIADOR",
+                "PAIS_ORIGEM_SHIPPING",
+                "PAIS_DESTINO_SHIPPING",
+                "ROMANEIO_ATUAL",
+                "TABELA",
+                ROW_NUMBER() OVER (PARTITION BY "ROMANEIO_ATUAL" ORDER BY "TABELA") AS rn
+            FROM CombinedData
+        )
+        SELECT
+            "SHIPPING_CODE_ID",
+            "NEGOCIADOR",
+            "PAIS_ORIGEM_SHIPPING",
+            "PAIS_DESTINO_SHIPPING",
+            "ROMANEIO_ATUAL",
+            "TABELA"
+        FROM RankedData
+        WHERE rn = 1;
+    """
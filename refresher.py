@@ -0,0 +1,456 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process single-flight applies
+    fcntl = None
+
+from snapshot import (
+    CACHE_FILE,
+    as_aware,
+    timezone,
+    freeze_snapshot,
+    is_legacy_cache,
+    migrate_legacy_cache,
+    read_persistent_cache,
+    view_positions,
+)
+from scheduler import TransitionScheduler, view_transitions
+
+logger = logging.getLogger(__name__)
+
+# Lock file shared by every app process using the same cache folder
+LOCK_FILE = CACHE_FILE.with_suffix(".lock")
+
+# Worker state (refreshing, last error) for readers in other processes
+STATUS_FILE = CACHE_FILE.with_name("controle_patio_status.json")
+
+# Full reload requested by a reader (?force=1) with no worker of its own
+FORCE_FILE = CACHE_FILE.with_name("controle_patio_force")
+
+# Refresh lease next to the cache file. Replicas on other hosts sharing the volume
+# don't see each other's flock, so the writer also holds this file (owner inside);
+# its owner renews it every LEASE_TTL / 3 while refreshing, and it expires LEASE_TTL
+# after the last renewal, in case the owner died mid-refresh
+LEASE_FILE = CACHE_FILE.with_name("controle_patio_cache.lease")
+LEASE_TTL = timedelta(minutes=15)
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Refreshes normally run when the watermark probe sees a change (a moved dimension
+# watermark also reloads that dimension); this is the longest a snapshot is kept
+# without one. Dimension TTLs are only checked on a refresh, so REF_TTL (6h) applies
+# at the first refresh after it runs out
+REFRESH_EVERY = timedelta(hours=1)
+
+# How often the worker probes the source watermarks for changes
+POLL_EVERY_SECONDS = 10
+
+# Wait before retrying after a failed refresh
+RETRY_AFTER_ERROR = timedelta(minutes=1)
+
+
+@contextmanager
+def process_lock(path):
+    # Non-blocking: yields False when another process holds the lock
+    if fcntl is None:
+        yield True
+        return
+
+    with open(path, "a+") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _lease_is_stale(path, stat, ttl):
+    if time.time() - stat.st_mtime >= ttl.total_seconds():
+        return True
+    # Same host: stale as soon as its owner is gone
+    try:
+        host, pid = path.read_text(encoding="utf-8").rsplit(":", 1)
+        if host == socket.gethostname():
+            os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def _move_aside(path, stat):
+    # Takes a stale lease out of the way atomically. Replicas racing for it each
+    # rename whatever is at `path`; one that got a different file than the stale one
+    # it checked (a lease just taken by the winner) puts it back
+    aside = path.with_name(f"{path.name}.{socket.gethostname()}.{os.getpid()}.stale")
+    try:
+        os.rename(path, aside)
+    except FileNotFoundError:
+        return
+    try:
+        # Inode numbers get reused right away; the mtime tells a new lease apart
+        moved = aside.stat()
+        if (moved.st_ino, moved.st_mtime_ns) != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                os.link(aside, path)
+            except FileExistsError:
+                logger.warning("lease %s changed hands while being taken over", path)
+    finally:
+        aside.unlink(missing_ok=True)
+
+
+def _heartbeat(path, every, stop, on_renew):
+    while not stop.wait(every):
+        if not renew_lease(path):
+            logger.warning("refresh lease %s is no longer ours; another replica may be refreshing", path)
+            return
+        if on_renew is not None:
+            on_renew()
+
+
+@contextmanager
+def refresh_lease(path, ttl, on_renew=None):
+    # Non-blocking like process_lock: yields False while another owner holds a live
+    # lease. While held, a heartbeat thread renews it every ttl / 3, so a long step
+    # (full history load_data, a slow volume) doesn't let it expire, and calls
+    # on_renew after each renewal.
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        stat = None
+    if stat is not None:
+        if not _lease_is_stale(path, stat, ttl):
+            yield False
+            return
+        _move_aside(path, stat)
+
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        yield False
+        return
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(LEASE_OWNER)
+        fh.flush()
+        taken = os.fstat(fh.fileno())
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(path, ttl.total_seconds() / 3, stop, on_renew), name="refresh-lease", daemon=True
+    )
+    heartbeat.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        heartbeat.join()
+        # Renewals move the mtime: still ours if it is the same file, owner inside
+        try:
+            if path.stat().st_ino == taken.st_ino and path.read_text(encoding="utf-8") == LEASE_OWNER:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def renew_lease(path):
+    # Pushes the expiry of a lease this process holds LEASE_TTL further; False if
+    # it isn't ours (any more)
+    try:
+        if path.read_text(encoding="utf-8") != LEASE_OWNER:
+            return False
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def read_status():
+    # {"refreshing", "started_at", "step", "error", "error_at", "updated_at"} as written
+    # by the worker, or None. A worker that died mid-refresh leaves "refreshing": true
+    # behind: without a live lease or a write within LEASE_TTL (the lease heartbeat
+    # rewrites it) that is reported as not refreshing, with "stale": true
+    try:
+        status = json.loads(STATUS_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    if status.get("refreshing") and not _still_refreshing(status):
+        status.update(refreshing=False, stale=True)
+    return status
+
+
+def _still_refreshing(status):
+    updated_at = status.get("updated_at")
+    if updated_at is None or datetime.now(timezone) - as_aware(updated_at) >= LEASE_TTL:
+        return False
+    try:
+        stat = LEASE_FILE.stat()
+    except FileNotFoundError:
+        return False
+    return not _lease_is_stale(LEASE_FILE, stat, LEASE_TTL)
+
+
+def _cache_key():
+    # Changes whenever a generation is published (rename -> new inode)
+    try:
+        stat = CACHE_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class SnapshotRefresher:
+    # One background worker per process owns the DB fetch and the snapshot build.
+    # Sessions only call latest(); generations published by other processes or
+    # replicas are picked up when the cache file is replaced, and the previous one
+    # keeps being served until the new one reads back. The pipeline only runs when
+    # the watermark probe differs from the one stored with the snapshot, or the
+    # snapshot is older than refresh_every.
+
+    def __init__(self, refresh_every=REFRESH_EVERY, poll_every=POLL_EVERY_SECONDS):
+        self.refresh_every = refresh_every
+        self.poll_every = poll_every
+
+        self.refreshing = False
+        # When the running refresh started and which of pipeline.REFRESH_STEPS it is in
+        self.refresh_started_at = None
+        self.refresh_step = None
+        self.last_error = None
+        self.last_error_at = None
+
+        self._snapshot = None
+        self._snapshot_key = None
+        self._scheduler = None
+        self._read_lock = threading.Lock()
+        self._flight = threading.Lock()
+        self._wake = threading.Event()
+        self._force = False
+        self._force_full = False
+        self._thread = None
+        # True in the process that runs the refresh loop (thread or foreground)
+        self.running = False
+
+    def start(self):
+        if self._thread is None:
+            self.running = True
+            self._thread = threading.Thread(target=self.run_forever, name="snapshot-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def request_refresh(self, full=False):
+        if not self.running:
+            # Pure reader: hand the request to the external builder
+            FORCE_FILE.write_text("full" if full else "", encoding="utf-8")
+            return
+        self._force_full = self._force_full or full
+        self._force = True
+        self._wake.set()
+
+    def take_force_request(self):
+        # Consumes a request left in FORCE_FILE by a reader; the next refresh_if_due()
+        # of this process runs it. True if there was one
+        try:
+            full = FORCE_FILE.read_text(encoding="utf-8") == "full"
+            FORCE_FILE.unlink()
+        except FileNotFoundError:
+            return False
+        self._force_full = self._force_full or full
+        self._force = True
+        return True
+
+    def _progress(self):
+        return {
+            "started_at": self.refresh_started_at.isoformat() if self.refresh_started_at is not None else None,
+            "step": self.refresh_step,
+        }
+
+    def _set_step(self, step):
+        self.refresh_step = step
+        self._write_status()
+
+    def _write_status(self):
+        status = {
+            "refreshing": self.refreshing,
+            **self._progress(),
+            "error": (
+                "".join(traceback.format_exception(self.last_error)) if self.last_error is not None else None
+            ),
+            "error_at": self.last_error_at.isoformat() if self.last_error_at is not None else None,
+            "updated_at": datetime.now(timezone).isoformat(),
+        }
+        # Also written from the lease heartbeat thread: one temp file per thread
+        tmp = STATUS_FILE.with_name(f"{STATUS_FILE.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(json.dumps(status), encoding="utf-8")
+            os.replace(tmp, STATUS_FILE)
+        except OSError:
+            logger.warning("could not write %s", STATUS_FILE, exc_info=True)
+
+    def status(self):
+        # Same shape as read_status(); from memory when this process runs the worker
+        if not self.running:
+            return read_status() or {
+                "refreshing": False,
+                "started_at": None,
+                "step": None,
+                "error": None,
+                "error_at": None,
+            }
+        return {
+            "refreshing": self.refreshing,
+            **self._progress(),
+            "error": str(self.last_error) if self.last_error is not None else None,
+            "error_at": self.last_error_at.isoformat() if self.last_error_at is not None else None,
+        }
+
+    def _publish(self, snapshot, key):
+        # Caller holds _read_lock; the transition heap is rebuilt lazily. Sessions get
+        # this object by reference, never a copy
+        self._snapshot, self._snapshot_key = freeze_snapshot(snapshot), key
+        self._scheduler = None
+
+    def latest(self):
+        with self._read_lock:
+            key = _cache_key()
+            if key is None:
+                if self._snapshot is None:
+                    # Or the legacy JSON cache, read in memory
+                    snapshot = read_persistent_cache()
+                    if snapshot is not None:
+                        self._publish(snapshot, _cache_key())
+            elif key != self._snapshot_key:
+                # A failed read (None) keeps the previous generation on screen; the
+                # file is only read again once it is replaced
+                snapshot = read_persistent_cache()
+                if snapshot is not None:
+                    self._publish(snapshot, key)
+                else:
+                    self._snapshot_key = key
+            return self._snapshot
+
+    def next_transition(self, filters=None, show_all=False, now=None):
+        # (instant, CAVALO, new state) of the next PRIORIDADE / window change in the
+        # published snapshot; None when nothing is pending. Without URL filters it
+        # comes from the heap shared by all sessions; a filtered view only gets the
+        # crossings of rows it can show that change what it shows
+        snapshot = self.latest()
+        if snapshot is None or is_legacy_cache(snapshot):
+            return None
+        with self._read_lock:
+            if self._scheduler is None or self._snapshot is not snapshot:
+                self._scheduler = TransitionScheduler(snapshot["df"], now=now)
+            scheduler = self._scheduler
+        if not filters:
+            return scheduler.next_transition(now)
+
+        # NEGOCIADOR / RUMO fix the rows; PRIORIDADE and the window move with the clock
+        fixed = {col: values for col, values in filters.items() if col != "PRIORIDADE"}
+        rows = view_positions(snapshot, fixed, show_all=True) if fixed else None
+        steps = view_transitions(filters.get("PRIORIDADE"), show_all)
+        return scheduler.next_transition(now, rows=rows, steps=steps)
+
+    def is_due(self, snapshot):
+        if snapshot is None or is_legacy_cache(snapshot) or snapshot.get("saved_at") is None:
+            return True
+        return (datetime.now(timezone) - as_aware(snapshot["saved_at"])) >= self.refresh_every
+
+    def _probe(self):
+        # The DB side (sqlalchemy, psycopg2, queries) is imported on first use, so
+        # processes that only read the snapshot never load it
+        from pipeline import probe_watermarks
+
+        try:
+            return probe_watermarks()
+        except Exception:
+            logger.warning("watermark probe failed", exc_info=True)
+            return None
+
+    def _needs_refresh(self, snapshot, watermarks):
+        if self.is_due(snapshot):
+            return True
+        return watermarks is not None and watermarks != snapshot.get("watermarks")
+
+    def refresh_if_due(self, force=False, full=False):
+        with self._flight:
+            forced = self._force or force
+            watermarks = None
+            if not forced:
+                if self.last_error_at is not None and (
+                    datetime.now(timezone) - self.last_error_at < RETRY_AFTER_ERROR
+                ):
+                    return False
+                snapshot = self.latest()
+                if not self.is_due(snapshot):
+                    watermarks = self._probe()
+                    if not self._needs_refresh(snapshot, watermarks):
+                        return False
+
+            with process_lock(LOCK_FILE) as locked, refresh_lease(
+                LEASE_FILE, LEASE_TTL, on_renew=self._write_status
+            ) as leased:
+                if not (locked and leased):
+                    # Another process or replica is refreshing; its result arrives through latest()
+                    return False
+                # The legacy JSON cache becomes the first generation, written only
+                # here, with the lock and lease held
+                migrated = migrate_legacy_cache()
+                if migrated is not None:
+                    with self._read_lock:
+                        self._publish(migrated, _cache_key())
+                # Someone may have published while we were waiting for the lock
+                current = self.latest()
+                if not forced and not self._needs_refresh(current, watermarks):
+                    return False
+                previous_watermarks = current.get("watermarks") if current is not None else None
+
+                force_full = self._force_full or full
+                self._force = self._force_full = False
+                self.refreshing = True
+                self.refresh_started_at = datetime.now(timezone)
+                self.refresh_step = None
+                self._write_status()
+                try:
+                    # Probe before the fetch, so changes made during it trigger the next refresh
+                    if watermarks is None:
+                        watermarks = self._probe()
+                    from pipeline import refresh_snapshot
+
+                    snapshot = refresh_snapshot(
+                        force_full=force_full,
+                        watermarks=watermarks,
+                        progress=self._set_step,
+                        previous_watermarks=previous_watermarks,
+                    )
+                    with self._read_lock:
+                        self._publish(snapshot, _cache_key())
+                    self.last_error = None
+                    self.last_error_at = None
+                except Exception as e:
+                    self.last_error = e
+                    self.last_error_at = datetime.now(timezone)
+                    logger.exception("snapshot refresh failed")
+                finally:
+                    self.refreshing = False
+                    self.refresh_started_at = self.refresh_step = None
+                    self._write_status()
+        return True
+
+    def run_forever(self):
+        self.running = True
+        while True:
+            self.take_force_request()
+            self.refresh_if_due()
+            self._wake.wait(timeout=self.poll_every)
+            self._wake.clear()
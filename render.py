@@ -0,0 +1,261 @@
+from functools import lru_cache
+from html import escape
+
+import pandas as pd
+
+# =========================
+# Yard table renderer
+# =========================
+# (column, width px) in display order; columns missing here get DEFAULT_WIDTH
+COLUMN_SPEC = [
+    ("CAVALO", 130),
+    ("CARRETA", 130),
+    ("NEGOCIADOR", 230),
+    ("RUMO", 100),
+    ("ENTRADA", 170),
+    ("TEMPO PATIO", 170),
+    ("PREVISAO SAIDA", 180),
+    ("PRIORIDADE", 160),
+    ("MOTORISTA", 180),
+    ("REFERENCIA ATUAL", 440),
+]
+DEFAULT_WIDTH = 150
+
+# PRIORIDADE -> row class (accented labels kept for older snapshots)
+PRIORITY_CLASSES = {
+    "CRITICA": "p-critica",
+    "URGENCIA": "p-urgencia",
+    "ATENCAO": "p-atencao",
+    "CRÍTICA": "p-critica",
+    "URGÊNCIA": "p-urgencia",
+    "ATENÇÃO": "p-atencao",
+}
+
+TABLE_STYLE = """
+<style>
+.tabela-custom {
+    max-height: 850px;
+    overflow-y: auto;
+    overflow-x: auto;
+    display: block;
+    border: 1px solid #ccc;
+    border-radius: 10px;
+}
+.tabela-custom th {
+    color: #434343 !important;
+    background-color: #f0f2f6 !important;
+}
+
+.tabela-custom td {
+    color: #434343 !important;
+}
+
+.tabela-custom table {
+    border-collapse: collapse;
+    table-layout: fixed !important;
+    width: max-content !important;
+    font-family: Arial, sans-serif;
+    text-align: center;
+}
+
+.tabela-custom th, .tabela-custom td {
+    padding: 0;
+    border: 1px solid #ddd;
+    font-weight: bold;
+    color: #434343;
+    white-space: nowrap;
+    overflow-wrap: normal;
+    word-break: normal;
+    overflow: hidden;
+    text-overflow: ellipsis;
+    text-align: center;
+}
+
+.tabela-custom .tabela-patio thead th {
+    text-align: center;
+    font-weight: bold;
+}
+
+.tabela-custom .tabela-patio td {
+    font-family: Arial, sans-serif;
+    font-size: 21px;
+    font-weight: bold;
+    vertical-align: middle;
+    background-color: #161b2e;
+}
+
+.tabela-custom .tabela-patio td:last-child {
+    text-align: left;
+}
+
+.tabela-custom .tabela-patio tr.p-critica td { background-color: #FF000044; }
+.tabela-custom .tabela-patio tr.p-urgencia td { background-color: #F8747458; }
+.tabela-custom .tabela-patio tr.p-atencao td { background-color: #F6F93F4B; }
+
+@media (forced-colors: active) {
+  .tabela-custom th, .tabela-custom td {
+    forced-color-adjust: none;
+    color: #434343 !important;
+    background-color: white !important;
+  }
+}
+</style>
+"""
+
+# Page chrome, built once per process like TABLE_STYLE
+PAGE_STYLE = """
+<style>
+    header, footer { visibility: hidden; }
+    .main > div:first-child { padding-top: 0rem; }
+
+    .block-container {
+        padding-top: 0rem;
+        padding-bottom: 0rem;
+        padding-left: 1rem;
+        padding-right: 1rem;
+    }
+
+    .stApp { background-color: #0b0f1d; }
+    .block-container { background-color: #0b0f1d; }
+</style>
+"""
+
+TOGGLE_STYLE = """
+<style>
+    div[data-testid="stToggle"] { margin-top: 0 !important; margin-bottom: 0 !important; }
+    div[data-testid="stToggle"] label { margin-bottom: 0 !important; }
+</style>
+"""
+
+_WIDTHS = dict(COLUMN_SPEC)
+
+
+def _cell_values(series: pd.Series) -> list:
+    # Same blanks as the view build: NaN/None -> "", everything else as text
+    values = series.astype(object).where(series.notna(), "").tolist()
+    return ["" if v is None else str(v) for v in values]
+
+
+def _cell_text(series: pd.Series) -> list:
+    return [escape(v, quote=False) for v in _cell_values(series)]
+
+
+def _row_classes(df: pd.DataFrame) -> list:
+    # PRIORIDADE -> row class name ("" for rows without one)
+    if "PRIORIDADE" not in df.columns:
+        return [""] * len(df)
+    return [PRIORITY_CLASSES.get(p, "") for p in df["PRIORIDADE"].tolist()]
+
+
+@lru_cache(maxsize=32)
+def _table_head(columns: tuple) -> str:
+    # <colgroup> + <thead> only depend on the column list, which rarely changes
+    colgroup = "".join(f"<col style='width:{_WIDTHS.get(c, DEFAULT_WIDTH)}px'>" for c in columns)
+    header = "".join(f"<th>{escape(str(c), quote=False)}</th>" for c in columns)
+    return f"<colgroup>{colgroup}</colgroup><thead><tr>{header}</tr></thead>"
+
+
+def render_table(df: pd.DataFrame) -> str:
+    # Compact <table>: one class per row, widths from COLUMN_SPEC, no per-cell CSS
+    columns = list(df.columns)
+    if not columns:
+        return "<table class='tabela-patio'></table>"
+
+    classes = [f' class="{c}"' if c else "" for c in _row_classes(df)]
+
+    row_template = "<tr{}>" + "<td>{}</td>" * len(columns) + "</tr>"
+    cells = [_cell_text(df[c]) for c in columns]
+    body = "".join(row_template.format(*row) for row in zip(classes, *cells))
+
+    return (
+        "<table class='tabela-patio'>"
+        f"{_table_head(tuple(columns))}"
+        f"<tbody>{body}</tbody>"
+        "</table>"
+    )
+
+
+# =========================
+# Row model for the table component (delta updates)
+# =========================
+# Column the component keeps ticking in the browser from each row's entry time, so a
+# passing minute changes no row on the server side
+CLOCK_COLUMN = "TEMPO PATIO"
+
+
+def table_state(df: pd.DataFrame, since: pd.Series = None) -> dict:
+    # What a client table shows: {"columns", "order", "rows": {key: (class, cells, since)}}.
+    # Rows are keyed by CAVALO plus its occurrence, since a vehicle may have more
+    # than one row; cells are plain text (the component sets textContent). With
+    # `since` (entry timestamps aligned with df), CLOCK_COLUMN is left blank and
+    # computed by the browser from `since` as epoch seconds.
+    columns = tuple(df.columns)
+    if "CAVALO" in df.columns:
+        seen = {}
+        keys = []
+        for cavalo in _cell_values(df["CAVALO"]):
+            seen[cavalo] = seen.get(cavalo, -1) + 1
+            keys.append(f"{cavalo}#{seen[cavalo]}")
+    else:
+        keys = [str(i) for i in range(len(df))]
+
+    ticking = since is not None and CLOCK_COLUMN in df.columns
+    if ticking:
+        epoch = (since - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+        since_values = epoch.astype(object).where(epoch.notna(), None).tolist()
+    else:
+        since_values = [None] * len(df)
+
+    cells = [[""] * len(df) if ticking and c == CLOCK_COLUMN else _cell_values(df[c]) for c in columns]
+    rows = {
+        key: (cls, tuple(row), since_value)
+        for key, cls, since_value, *row in zip(keys, _row_classes(df), since_values, *cells)
+    }
+    return {"columns": columns, "order": tuple(keys), "rows": rows}
+
+
+def _as_lists(row):
+    cls, cells, since = row
+    return [cls, list(cells), since]
+
+
+def table_full(state: dict) -> dict:
+    # Payload that (re)builds the client table from scratch
+    return {
+        "full": True,
+        "style": TABLE_STYLE,
+        "columns": list(state["columns"]),
+        "widths": [_WIDTHS.get(c, DEFAULT_WIDTH) for c in state["columns"]],
+        "clock_column": state["columns"].index(CLOCK_COLUMN) if CLOCK_COLUMN in state["columns"] else None,
+        "rows": [[key, *_as_lists(state["rows"][key])] for key in state["order"]],
+    }
+
+
+def table_patch(previous: dict, current: dict) -> dict:
+    # Changes from `previous` to `current` (table_state): changed rows, removed keys
+    # and new rows with the key they go before (None = end). The whole key order is
+    # only sent when surviving rows swapped places. Full payload when columns change.
+    if previous is None or previous["columns"] != current["columns"]:
+        return table_full(current)
+
+    prev_rows, rows = previous["rows"], current["rows"]
+    update = [[key, *_as_lists(row)] for key, row in rows.items() if key in prev_rows and prev_rows[key] != row]
+    remove = [key for key in prev_rows if key not in rows]
+
+    kept_before = [key for key in previous["order"] if key in rows]
+    kept_now = [key for key in current["order"] if key in prev_rows]
+    if kept_before != kept_now:
+        # Reordered: new rows are appended and the order below places everything
+        insert = [[key, *_as_lists(rows[key]), None] for key in current["order"] if key not in prev_rows]
+        order = list(current["order"])
+    else:
+        # Last to first, so each row's successor is already in place
+        order = None
+        insert = []
+        following = None
+        for key in reversed(current["order"]):
+            if key not in prev_rows:
+                insert.append([key, *_as_lists(rows[key]), following])
+            following = key
+
+    return {"full": False, "update": update, "remove": remove, "insert": insert, "order": order}
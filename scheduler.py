@@ -0,0 +1,110 @@
+import heapq
+import threading
+
+import numpy as np
+import pandas as pd
+
+from snapshot import LIMITE_SEGUNDOS, PREVISAO_TS
+
+# State changes as seconds before DATA_PREVISTA_SAIDA, in order. apply_clock truncates
+# to whole seconds, so e.g. "tempo > 7200" (NORMAL) ends 7201 s before the prevista
+# and "tempo < 0" (CRITICA) starts 1 s after it.
+TRANSITIONS = [
+    (LIMITE_SEGUNDOS + 1, "JANELA"),  # enters the 4-hour window of view_positions
+    (7201, "ATENCAO"),
+    (1801, "URGENCIA"),
+    (1, "BAIXA"),
+    (-1, "CRITICA"),
+]
+
+_OFFSETS_NS = np.array([s for s, _ in TRANSITIONS], dtype="int64") * 1_000_000_000
+
+# PRIORIDADE after / before each crossing (entering the window keeps NORMAL)
+_AFTER = ["NORMAL"] + [label for _, label in TRANSITIONS[1:]]
+_BEFORE = ["NORMAL"] + _AFTER[:-1]
+
+
+def view_transitions(prioridades=None, show_all=False):
+    # Mask over TRANSITIONS of the crossings that change what a view shows: a row
+    # entering or leaving it (?prioridade= labels, 4-hour window) or its PRIORIDADE
+    # changing on screen
+    def visible(label, in_window):
+        return (not prioridades or label in prioridades) and (in_window or show_all)
+
+    mask = []
+    for k in range(len(TRANSITIONS)):
+        before, after = visible(_BEFORE[k], k > 0), visible(_AFTER[k], True)
+        mask.append((before or after) and (before != after or _BEFORE[k] != _AFTER[k]))
+    return np.array(mask)
+
+
+class TransitionScheduler:
+    # Min-heap with the next threshold crossing of each vehicle in a static view.
+    # Popping a crossing pushes that vehicle's following one, so the heap holds at
+    # most one entry per row and next_transition() is O(log n) per crossing.
+
+    def __init__(self, df_static, now=None):
+        prevista = pd.to_datetime(df_static[PREVISAO_TS], errors="coerce")
+        self._tz = prevista.dt.tz
+        valid = prevista.notna().to_numpy()
+        prevista_ns = prevista.to_numpy(dtype="datetime64[ns]").astype("int64")
+
+        # times[i, k]: instant row i reaches TRANSITIONS[k]; increasing along k
+        self._times = prevista_ns[:, None] - _OFFSETS_NS[None, :]
+        self._valid = valid
+        self._plates = df_static["CAVALO"].tolist() if "CAVALO" in df_static.columns else [None] * len(df_static)
+        self._lock = threading.Lock()
+
+        now_ns = self._to_ns(now)
+        passed = (self._times <= now_ns).sum(axis=1)
+        self._heap = [
+            (int(self._times[i, k]), i, int(k))
+            for i, k in enumerate(passed.tolist())
+            if valid[i] and k < len(TRANSITIONS)
+        ]
+        heapq.heapify(self._heap)
+
+    @staticmethod
+    def _to_ns(now):
+        now = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz="UTC")
+        if now.tzinfo is None:
+            now = now.tz_localize("UTC")
+        return now.value
+
+    def next_transition(self, now=None, rows=None, steps=None):
+        # (instant, CAVALO, new state) of the first crossing after `now`, or None.
+        # The heap covers every row and crossing; a view passes its row positions
+        # and/or a mask over TRANSITIONS (view_transitions) instead
+        now_ns = self._to_ns(now)
+        if rows is not None or steps is not None:
+            return self._next_in_view(now_ns, rows, steps)
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ns:
+                _, i, k = heapq.heappop(self._heap)
+                if k + 1 < len(TRANSITIONS):
+                    heapq.heappush(self._heap, (int(self._times[i, k + 1]), i, k + 1))
+            if not self._heap:
+                return None
+            at_ns, i, k = self._heap[0]
+        return self._result(at_ns, i, k)
+
+    def _next_in_view(self, now_ns, rows, steps):
+        # Vectorized scan of the view's rows: O(rows) per call, no shared state
+        rows = np.arange(len(self._valid)) if rows is None else np.asarray(rows, dtype="int64")
+        rows = rows[self._valid[rows]]
+        times = self._times[rows]
+        never = np.iinfo(np.int64).max
+        future = times > now_ns
+        if steps is not None:
+            future &= np.asarray(steps)[None, :]
+        times = np.where(future, times, never)
+        if times.size == 0 or times.min() == never:
+            return None
+        r, k = np.unravel_index(np.argmin(times), times.shape)
+        return self._result(int(times[r, k]), int(rows[r]), int(k))
+
+    def _result(self, at_ns, i, k):
+        at = pd.Timestamp(at_ns, tz="UTC")
+        if self._tz is not None:
+            at = at.tz_convert(self._tz)
+        return at, self._plates[i], TRANSITIONS[k][1]
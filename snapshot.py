@@ -0,0 +1,531 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytz
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Snapshot: view build, clock pass and the persistent cache
+# =========================
+# Everything a cache-hit render needs; the DB side (pipeline.py) is only imported
+# by the refresh worker.
+timezone = pytz.timezone("America/Sao_Paulo")
+
+
+def as_aware(value):
+    # ISO string / Timestamp / datetime / None -> aware datetime (naive = timezone) or None
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if hasattr(value, "to_pydatetime"):
+        value = value.to_pydatetime()
+    return value if value.tzinfo is not None else timezone.localize(value)
+
+
+# Persistent cache file (same folder as app.py): Arrow IPC, memory-mapped on read
+CACHE_FILE = Path(__file__).with_name("controle_patio_cache.arrow")
+
+# Previous JSON cache: served from memory while CACHE_FILE doesn't exist, and written
+# to it by the refresher (migrate_legacy_cache)
+LEGACY_CACHE_FILE = Path(__file__).with_name("controle_patio_cache.json")
+
+LIMITE_HORAS = 4
+LIMITE_SEGUNDOS = LIMITE_HORAS * 3600
+# 4: the snapshot stores the static view plus raw timestamps (see apply_clock)
+CACHE_FORMAT_VERSION = 4
+
+
+# =========================
+# Persistent Disk Cache (Arrow IPC)
+# =========================
+def _to_iso(value):
+    if value is None:
+        return None
+    # pandas Timestamp -> python datetime
+    if hasattr(value, "to_pydatetime"):
+        value = value.to_pydatetime()
+    return value.isoformat()
+
+
+def _read_meta(schema):
+    return json.loads((schema.metadata or {}).get(b"controle_patio", b"{}"))
+
+
+def current_generation():
+    # Generation of the published snapshot (bumped by every write); 0 when there is none
+    try:
+        with pa.memory_map(str(CACHE_FILE), "r") as source:
+            return int(_read_meta(pa.ipc.open_file(source).schema).get("generation", 0))
+    except (OSError, ValueError, pa.ArrowException):
+        return 0
+
+
+def read_persistent_cache():
+    # None when there is no readable snapshot; callers keep serving the one they have
+    if not CACHE_FILE.exists():
+        return read_legacy_cache()
+
+    try:
+        with stage("cache_read") as info:
+            with pa.memory_map(str(CACHE_FILE), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            info["rows"], info["bytes"] = table.num_rows, CACHE_FILE.stat().st_size
+
+        meta = _read_meta(table.schema)
+        df_cached = table.to_pandas()
+
+        last_update_iso = meta.get("last_update")
+        last_update = pd.to_datetime(last_update_iso) if last_update_iso else None
+
+        saved_at_iso = meta.get("saved_at")
+        saved_at = pd.to_datetime(saved_at_iso) if saved_at_iso else None
+
+        qtd_placas = meta.get("qtd_placas", 0)
+        cache_version = meta.get("cache_version", 1)
+        watermarks = meta.get("watermarks")
+
+        return {
+            "df": df_cached,
+            "generation": meta.get("generation", 0),
+            "last_update": last_update,
+            "saved_at": saved_at,
+            "qtd_placas": qtd_placas,
+            "cache_version": cache_version,
+            "watermarks": watermarks,
+        }
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        logger.warning("could not read %s", CACHE_FILE, exc_info=True)
+        return None
+
+
+def _write_snapshot(df_static, meta):
+    # Returns the generation written. Callers serialize writers (refresher lease).
+    meta = {**meta, "generation": current_generation() + 1}
+    table = pa.Table.from_pandas(df_static, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"controle_patio"] = json.dumps(meta).encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+
+    # Written next to CACHE_FILE and renamed over it: readers in any process or
+    # replica see the previous generation or the new one, never a partial file.
+    # Memory maps of the previous file stay valid until they are closed.
+    tmp = CACHE_FILE.with_name(f"{CACHE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        # Uncompressed so readers can memory-map the columns
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        with open(tmp, "rb") as fh:
+            os.fsync(fh.fileno())
+        os.replace(tmp, CACHE_FILE)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return meta["generation"]
+
+
+def write_persistent_cache(df_static, last_update, qtd_placas, watermarks=None):
+    now_sp = datetime.now(timezone)
+
+    meta = {
+        "saved_at": now_sp.isoformat(),
+        "last_update": _to_iso(last_update),
+        "qtd_placas": int(qtd_placas),
+        "cache_version": CACHE_FORMAT_VERSION,
+        # Probe result taken before the fetch; refreshes compare against it
+        "watermarks": watermarks,
+    }
+    generation = _write_snapshot(df_static, meta)
+
+    # Same shape as read_persistent_cache()
+    return {
+        "df": df_static,
+        "generation": generation,
+        "last_update": pd.to_datetime(meta["last_update"]) if meta["last_update"] else None,
+        "saved_at": pd.Timestamp(now_sp),
+        "qtd_placas": meta["qtd_placas"],
+        "cache_version": CACHE_FORMAT_VERSION,
+        "watermarks": watermarks,
+    }
+
+
+def freeze_snapshot(snapshot):
+    # A published snapshot (one generation) is shared by reference by every session
+    # of the process, so it is read-only: the mapping can't be changed, and the frame
+    # is only ever read. With Copy-on-Write every frame derived from it (session_rows)
+    # is independent and shares the untouched columns instead of copying them.
+    # Its view index (build_view_index) is built here, once per generation.
+    snapshot = dict(snapshot)
+    if not is_legacy_cache(snapshot):
+        snapshot["index"] = build_view_index(snapshot["df"])
+    return MappingProxyType(snapshot)
+
+
+def is_legacy_cache(cached):
+    return cached.get("cache_version", 1) < CACHE_FORMAT_VERSION or (
+        PREVISAO_TS not in cached["df"].columns
+    )
+
+
+def _static_from_display(df):
+    # Legacy display frame -> static view: timestamps back from the formatted
+    # dates (minute precision), clock-driven columns dropped
+    df = df.drop(columns=["TEMPO PATIO", "PRIORIDADE", "_TEMPO_ATE_SAIDA_SEG"], errors="ignore")
+    for col, ts_col in (("ENTRADA", ENTRADA_TS), ("PREVISAO SAIDA", PREVISAO_TS)):
+        parsed = pd.to_datetime(df[col], format="%d/%m/%y %H:%M", errors="coerce")
+        df[ts_col] = localize_series(parsed)
+    return df
+
+
+def read_legacy_cache():
+    # The JSON cache as an in-memory snapshot (generation 0), or None. Its
+    # CACHE_FORMAT_VERSION 2 holds the display frame, converted with
+    # _static_from_display; v1 lacks _TEMPO_ATE_SAIDA_SEG and is left for a DB
+    # refresh to replace. Nothing is written here: readers don't hold the lease
+    if not LEGACY_CACHE_FILE.exists():
+        return None
+    try:
+        payload = json.loads(LEGACY_CACHE_FILE.read_text(encoding="utf-8"))
+        if payload.get("cache_version", 1) < 2:
+            return None
+        df_static = _static_from_display(pd.DataFrame(payload.get("rows", [])))
+    except (OSError, ValueError, KeyError):
+        logger.warning("could not read %s", LEGACY_CACHE_FILE, exc_info=True)
+        return None
+
+    last_update_iso = payload.get("last_update")
+    saved_at_iso = payload.get("saved_at")
+    return {
+        "df": df_static,
+        "generation": 0,
+        "last_update": pd.to_datetime(last_update_iso) if last_update_iso else None,
+        "saved_at": pd.to_datetime(saved_at_iso) if saved_at_iso else None,
+        "qtd_placas": payload.get("qtd_placas", 0),
+        "cache_version": CACHE_FORMAT_VERSION,
+        "watermarks": None,
+    }
+
+
+def migrate_legacy_cache():
+    # Writes the JSON cache as the first Arrow generation when there is none yet.
+    # Called by the refresher with its lock and lease held; returns the published
+    # snapshot, or None when there was nothing to migrate
+    if CACHE_FILE.exists():
+        return None
+    snapshot = read_legacy_cache()
+    if snapshot is None:
+        return None
+    meta = {
+        "saved_at": _to_iso(snapshot["saved_at"]),
+        "last_update": _to_iso(snapshot["last_update"]),
+        "qtd_placas": int(snapshot["qtd_placas"]),
+        "cache_version": CACHE_FORMAT_VERSION,
+    }
+    try:
+        snapshot["generation"] = _write_snapshot(snapshot["df"], meta)
+    except (OSError, ValueError, pa.ArrowException):
+        # The legacy file stays in place and the next DB refresh replaces it
+        logger.warning("could not migrate %s", LEGACY_CACHE_FILE, exc_info=True)
+        return None
+    return snapshot
+
+
+def localize_series(s: pd.Series) -> pd.Series:
+    # Naive timestamps are Sao Paulo local time; aware ones are kept as they are.
+    # ambiguous/nonexistent resolve like pytz localize(is_dst=False)
+    if s.dt.tz is not None:
+        return s
+    return s.dt.tz_localize(timezone, ambiguous=False, nonexistent=timedelta(hours=1))
+
+
+def format_duracao_series(segundos: pd.Series) -> pd.Series:
+    # "-1h 5min" / "2h" / "30min" / "0min"; empty string for missing values
+    out = pd.Series("", index=segundos.index)
+    valid = segundos.notna()
+    if not valid.any():
+        return out
+
+    T = np.trunc(segundos[valid].to_numpy(dtype="float64")).astype("int64")
+    sinal = pd.Series(np.where(T < 0, "-", ""), index=segundos.index[valid])
+    T = np.abs(T)
+    horas = pd.Series(T // 3600, index=sinal.index)
+    minutos = pd.Series((T % 3600) // 60, index=sinal.index)
+
+    h = horas.astype(str)
+    m = minutos.astype(str)
+    texto = pd.Series(
+        np.select(
+            [(horas > 0) & (minutos > 0), horas > 0, minutos > 0],
+            [h + "h " + m + "min", h + "h", m + "min"],
+            default="0min",
+        ),
+        index=sinal.index,
+    )
+
+    out[valid] = sinal + texto
+    return out
+
+
+# Raw columns read by build_view_from_raw
+VIEW_SOURCE_COLUMNS = [
+    "PLACA",
+    "PLACA_2",
+    "NEGOCIADOR",
+    "DATA_EFETIVA_ENTRADA",
+    "DATA_PREVISTA_SAIDA",
+    "MOTORISTA",
+    "REFERENCIA",
+    "PAIS_ORIGEM_SHIPPING",
+    "PAIS_DESTINO_SHIPPING",
+]
+
+
+# Hidden snapshot columns with the raw timestamps used by the clock pass
+ENTRADA_TS = "_ENTRADA_TS"
+PREVISAO_TS = "_PREVISAO_TS"
+
+# Display order after the clock pass
+DISPLAY_COLUMNS = [
+    "CAVALO",
+    "CARRETA",
+    "NEGOCIADOR",
+    "RUMO",
+    "ENTRADA",
+    "TEMPO PATIO",
+    "PREVISAO SAIDA",
+    "PRIORIDADE",
+    "MOTORISTA",
+    "REFERENCIA ATUAL",
+]
+
+
+def build_static_view(df_raw: pd.DataFrame):
+    # Everything in the view that does not depend on the clock; this is what the
+    # snapshot stores. apply_clock() derives the rest on every rerun.
+
+    # Base filter first (without 4-hour window): only SEM SAIDA rows are displayed,
+    # so every derived column below is computed on the active yard only
+    data_prevista = pd.to_datetime(df_raw["DATA_PREVISTA_SAIDA"], errors="coerce")
+    data_efetiva_saida = pd.to_datetime(df_raw["DATA_EFETIVA_SAIDA"], errors="coerce")
+    filtro_base = (
+        data_efetiva_saida.isna()
+        & (df_raw["SITUACAO_ID"].isin([2, 3]))
+        & (data_prevista.notna())
+    )
+    # Only the columns the view needs are copied
+    df = df_raw.loc[filtro_base, df_raw.columns.intersection(VIEW_SOURCE_COLUMNS)].copy()
+
+    # Dates
+    df["DATA_PREVISTA_SAIDA"] = data_prevista[filtro_base]
+    df["DATA_EFETIVA_ENTRADA"] = pd.to_datetime(df["DATA_EFETIVA_ENTRADA"], errors="coerce")
+
+    # Rumo from shipping countries
+    if "PAIS_ORIGEM_SHIPPING" in df.columns and "PAIS_DESTINO_SHIPPING" in df.columns:
+        # Categoricals with different categories cannot be compared directly
+        origem = df["PAIS_ORIGEM_SHIPPING"].astype(object)
+        destino = df["PAIS_DESTINO_SHIPPING"].astype(object)
+        rumo = np.select(
+            [origem.isna() | destino.isna(), origem == destino, destino == "Brasil"],
+            [None, "NAC", "RN"],
+            default="RS",
+        )
+        df["RUMO"] = rumo
+    else:
+        df["RUMO"] = None
+
+    # Reference uppercase
+    if "REFERENCIA" in df.columns:
+        df["REFERENCIA"] = df["REFERENCIA"].astype("string").str.upper()
+
+    # Motorista -> first name uppercase
+    if "MOTORISTA" in df.columns:
+        s = df["MOTORISTA"]
+        df["MOTORISTA"] = (
+            s.where(s.notna())
+            .astype("string")
+            .str.strip()
+            .str.upper()
+            .str.split()
+            .str[0]
+        )
+
+    colunas_exibir = [
+        "PLACA",
+        "PLACA_2",
+        "NEGOCIADOR",
+        "RUMO",
+        "DATA_EFETIVA_ENTRADA",
+        "DATA_PREVISTA_SAIDA",
+        "MOTORISTA",
+        "REFERENCIA",
+    ]
+
+    nomes_alterados = {
+        "PLACA": "CAVALO",
+        "PLACA_2": "CARRETA",
+        "NEGOCIADOR": "NEGOCIADOR",
+        "RUMO": "RUMO",
+        "DATA_EFETIVA_ENTRADA": "ENTRADA",
+        "DATA_PREVISTA_SAIDA": "PREVISAO SAIDA",
+        "MOTORISTA": "MOTORISTA",
+        "REFERENCIA": "REFERENCIA ATUAL",
+    }
+
+    df_exibir = df[colunas_exibir].rename(columns=nomes_alterados)
+    # The display frame is small: plain strings (categoricals reject fillna(""))
+    for col in df_exibir.columns:
+        if isinstance(df_exibir[col].dtype, pd.CategoricalDtype):
+            df_exibir[col] = df_exibir[col].astype(df_exibir[col].cat.categories.dtype)
+
+    # Raw timestamps (Sao Paulo, tz-aware) for the clock pass
+    df_exibir[ENTRADA_TS] = localize_series(df["DATA_EFETIVA_ENTRADA"])
+    df_exibir[PREVISAO_TS] = localize_series(df["DATA_PREVISTA_SAIDA"])
+
+    # Format dates for display
+    df_exibir["ENTRADA"] = pd.to_datetime(df_exibir["ENTRADA"], errors="coerce").dt.strftime(
+        "%d/%m/%y %H:%M"
+    )
+    df_exibir["PREVISAO SAIDA"] = pd.to_datetime(
+        df_exibir["PREVISAO SAIDA"], errors="coerce"
+    ).dt.strftime("%d/%m/%y %H:%M")
+
+    # Sort by PREVISAO SAIDA safely
+    sort_key = pd.to_datetime(df_exibir["PREVISAO SAIDA"], format="%d/%m/%y %H:%M", errors="coerce")
+    df_exibir["_sort"] = sort_key
+    df_exibir = df_exibir.sort_values("_sort").drop(columns="_sort")
+
+    texto = df_exibir.columns.difference([ENTRADA_TS, PREVISAO_TS], sort=False)
+    df_exibir[texto] = df_exibir[texto].fillna("").replace("None", "")
+
+    return df_exibir
+
+
+def apply_clock(df_static: pd.DataFrame, now=None):
+    # Clock pass: TEMPO PATIO, PRIORIDADE and _TEMPO_ATE_SAIDA_SEG for `now`.
+    # Cheap and vectorized, so it runs on every rerun instead of once per refresh.
+    # The result shares every other column with df_static (no copy of the snapshot).
+    now_adjusted = pd.Timestamp(now if now is not None else datetime.now(timezone))
+
+    # Tempo desde entrada ate agora
+    desde_entrada = np.trunc((now_adjusted - df_static[ENTRADA_TS]).dt.total_seconds())
+
+    # Tempo ate a saida prevista (always present after the base filter)
+    tempo = np.trunc((df_static[PREVISAO_TS] - now_adjusted).dt.total_seconds())
+    prioridade = np.select(
+        [tempo > 7200, tempo > 1800, tempo > 0, tempo < 0],
+        ["NORMAL", "ATENCAO", "URGENCIA", "CRITICA"],
+        default="BAIXA",
+    )
+
+    df = df_static.assign(**{"TEMPO PATIO": format_duracao_series(desde_entrada), "PRIORIDADE": prioridade})
+    # Whole seconds, as int(total_seconds()) gave them; never NaN after the base filter
+    return df[DISPLAY_COLUMNS].assign(_TEMPO_ATE_SAIDA_SEG=tempo.astype("int64"))
+
+
+# =========================
+# View index: URL views (?negociador= / ?rumo= / ?prioridade=) as index lookups
+# =========================
+# Columns with a prebuilt group index; values are matched case-insensitively
+INDEXED_COLUMNS = ["NEGOCIADOR", "RUMO"]
+
+_NS = 1_000_000_000
+
+# PRIORIDADE as [start, end) offsets (ns) of DATA_PREVISTA_SAIDA from now: the
+# ranges apply_clock gives each label once tempo is truncated to whole seconds
+# (same boundaries as scheduler.TRANSITIONS)
+PRIORITY_RANGES = {
+    "NORMAL": (7201 * _NS, None),
+    "ATENCAO": (1801 * _NS, 7201 * _NS),
+    "URGENCIA": (_NS, 1801 * _NS),
+    "BAIXA": (-_NS + 1, _NS),
+    "CRITICA": (None, -_NS + 1),
+}
+
+
+def _group_key(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(values.notna(), "").astype(str).str.strip().str.upper()
+
+
+def build_view_index(df_static: pd.DataFrame):
+    # Row positions (table order) per NEGOCIADOR / RUMO value, CAVALO codes for the
+    # per-view counts and the rows ordered by prevista for the PRIORIDADE and 4-hour
+    # ranges, which move with the clock
+    groups = {}
+    for col in INDEXED_COLUMNS:
+        if col in df_static.columns:
+            keys = _group_key(df_static[col])
+            groups[col] = {key: np.asarray(pos) for key, pos in keys.groupby(keys, sort=False).indices.items()}
+    cavalo_codes = (
+        pd.factorize(df_static["CAVALO"])[0] if "CAVALO" in df_static.columns else np.full(len(df_static), -1)
+    )
+
+    prevista = pd.to_datetime(df_static[PREVISAO_TS], errors="coerce")
+    valid = prevista.notna().to_numpy()
+    prevista_ns = prevista.to_numpy(dtype="datetime64[ns]").astype("int64")
+    by_prevista = np.flatnonzero(valid)[np.argsort(prevista_ns[valid], kind="stable")]
+    return {
+        "groups": groups,
+        "cavalo_codes": cavalo_codes,
+        "by_prevista": by_prevista,
+        "prevista_ns": prevista_ns[by_prevista],
+    }
+
+
+def _prevista_range(index, now_ns, start, end):
+    # Positions whose prevista is in [now + start, now + end) (ns), in table order
+    sorted_ns = index["prevista_ns"]
+    lo = 0 if start is None else np.searchsorted(sorted_ns, now_ns + start)
+    hi = len(sorted_ns) if end is None else np.searchsorted(sorted_ns, now_ns + end)
+    return np.sort(index["by_prevista"][lo:hi])
+
+
+def view_positions(snapshot, filters, show_all, now=None):
+    # Row positions (table order) of a view: {column: [values]} filters plus the
+    # 4-hour window unless show_all (prevista at most LIMITE_SEGUNDOS ahead).
+    index = snapshot["index"]
+    now_ns = pd.Timestamp(now if now is not None else datetime.now(timezone)).value
+
+    selected = []
+    for col, values in filters.items():
+        if col == "PRIORIDADE":
+            parts = [_prevista_range(index, now_ns, *PRIORITY_RANGES[v]) for v in values if v in PRIORITY_RANGES]
+        else:
+            group = index["groups"].get(col, {})
+            parts = [group[v] for v in values if v in group]
+        selected.append(np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype="int64"))
+    if not show_all:
+        selected.append(_prevista_range(index, now_ns, None, (LIMITE_SEGUNDOS + 1) * _NS))
+
+    if not selected:
+        return np.arange(len(snapshot["df"]))
+    positions = selected[0]
+    for other in selected[1:]:
+        positions = np.intersect1d(positions, other, assume_unique=True)
+    return positions
+
+
+def view_count(snapshot, positions):
+    # Distinct CAVALO among the view's rows ("Total de Saida Previstas")
+    codes = snapshot["index"]["cavalo_codes"][positions]
+    return len(np.unique(codes[codes >= 0]))
+
+
+def session_rows(df_static: pd.DataFrame, positions, now=None):
+    # Clock pass on the given rows only (view_positions, or a window of them)
+    df = apply_clock(df_static.iloc[positions], now=now)
+    return df.drop(columns=["_TEMPO_ATE_SAIDA_SEG"])
+
+
+def build_view_from_raw(df_raw: pd.DataFrame, now=None):
+    return apply_clock(build_static_view(df_raw), now=now)
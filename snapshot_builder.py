@@ -0,0 +1,48 @@
+"""Builds the dashboard snapshot without Streamlit.
+
+    python snapshot_builder.py             # refresh once if due (watermarks moved / too old)
+    python snapshot_builder.py --full      # full reload now
+    python snapshot_builder.py --daemon    # keep refreshing, like the in-app worker
+
+Run the app with SNAPSHOT_BUILDER=external so it only reads the snapshot this writes.
+Both can share the cache folder: refreshes are serialized by the same lock file.
+"""
+import argparse
+import logging
+import sys
+
+from refresher import POLL_EVERY_SECONDS, SnapshotRefresher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--daemon", action="store_true", help="keep running and refresh on changes")
+    parser.add_argument("--full", action="store_true", help="force a full reload")
+    parser.add_argument("--force", action="store_true", help="refresh even if nothing changed")
+    parser.add_argument("--poll", type=float, default=POLL_EVERY_SECONDS, help="daemon poll interval (s)")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    refresher = SnapshotRefresher(poll_every=args.poll)
+
+    if args.daemon:
+        if args.full or args.force:
+            refresher.running = True
+            refresher.request_refresh(full=args.full)
+        try:
+            refresher.run_forever()
+        except KeyboardInterrupt:
+            return 0
+
+    # A ?force=1 left by an app reader is served by this run too
+    refresher.take_force_request()
+    refresher.refresh_if_due(force=args.force or args.full, full=args.full)
+    return 1 if refresher.last_error is not None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import time
+from pathlib import Path
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from render import table_full, table_patch, table_state
+
+# =========================
+# Yard table component (frontend/tabela_patio): the browser keeps the table between
+# reruns and only receives the rows that changed
+# =========================
+_component = components.declare_component(
+    "tabela_patio", path=str(Path(__file__).with_name("frontend") / "tabela_patio")
+)
+
+# Rows sent at a time in windowed mode ("Mostrar todos"); the browser asks for the
+# window around what it shows as it scrolls near an edge of the one it has
+WINDOW_ROWS = 150
+
+
+def requested_window(total, key="tabela_patio"):
+    # [start, stop) of the rows the browser asked for, clamped to `total` rows
+    client = st.session_state.get(key) or {}
+    start = int((client.get("window") or [0])[0])
+    start = max(0, min(start, total - WINDOW_ROWS))
+    return start, min(start + WINDOW_ROWS, total)
+
+
+def tabela_patio(df, since=None, offset=0, total=None, key="tabela_patio"):
+    # Renders df and returns the payload sent. `since` (entry timestamps aligned with
+    # df) lets the browser tick TEMPO PATIO itself. In windowed mode df holds rows
+    # [offset, offset + len(df)) of a `total`-row table (see requested_window).
+    # The session keeps the table state the browser was last sent; the browser
+    # answers {"resync": nonce} when it can't apply a patch (missed update, reloaded
+    # iframe), which gets it the whole table.
+    sent = st.session_state.get(f"{key}_sent")
+    client = st.session_state.get(key) or {}
+    current = table_state(df, since=since)
+
+    if sent is None or client.get("resync") not in (None, sent["resync"]):
+        payload = table_full(current)
+    else:
+        payload = table_patch(sent["state"], current)
+
+    version = sent["version"] + 1 if sent is not None else 1
+    payload["base"] = sent["version"] if sent is not None else None
+    payload["version"] = version
+    payload["offset"] = offset
+    payload["total"] = total if total is not None else len(df)
+    payload["window_rows"] = WINDOW_ROWS
+    # Server clock, so the browser's TEMPO PATIO follows it and not the TV's clock
+    payload["now"] = time.time()
+    st.session_state[f"{key}_sent"] = {"state": current, "version": version, "resync": client.get("resync")}
+
+    _component(payload=payload, key=key, default=None)
+    return payload